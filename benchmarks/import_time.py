@@ -0,0 +1,72 @@
+"""Import-time budget for the package.
+
+Runs every statement in a fresh interpreter, keeps the best of several
+runs, and exits with status 1 if any statement goes over its budget or
+pulls in a module that should only be imported on first use.
+
+    python benchmarks/import_time.py [--runs 5] [--scale 1.0]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# statement -> budget in milliseconds
+BUDGETS = {
+    "import receipts_xyz": 20,
+    "from receipts_xyz import get_weekly_attested_workouts": 400,
+    "from receipts_xyz.v1 import get_user_workouts": 400,
+    "from receipts_xyz.v2.onchainsummer import get_onchainsummer_workouts": 400,
+}
+
+# modules that must not be loaded by any statement above
+LAZY_MODULES = ["web3", "requests", "pandas", "numpy"]
+
+_TEMPLATE = """
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed * 1000)
+print(",".join(_m for _m in {lazy_modules!r} if _m in sys.modules))
+"""
+
+
+def measure(statement: str, runs: int) -> tuple:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    best = float("inf")
+    loaded = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _TEMPLATE.format(statement=statement, lazy_modules=LAZY_MODULES)],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.splitlines()
+        best = min(best, float(output[0]))
+        loaded = [_m for _m in output[1].split(",") if _m]
+    return best, loaded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget, e.g. on slow CI machines")
+    args = parser.parse_args()
+
+    failed = False
+    for statement, budget in BUDGETS.items():
+        elapsed, loaded = measure(statement, args.runs)
+        budget *= args.scale
+        ok = elapsed <= budget and not loaded
+        failed |= not ok
+        status = "ok" if ok else "FAIL"
+        extra = f", eagerly loaded: {', '.join(loaded)}" if loaded else ""
+        print(f"[{status}] {elapsed:8.1f} ms / {budget:6.0f} ms  {statement}{extra}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
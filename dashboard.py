@@ -1,11 +1,14 @@
 from datetime import datetime
+from typing import Optional
 
-import streamlit as st
 import pandas as pd
+import streamlit as st
 import plotly.graph_objects as go
-import plotly.express as px
 import pytz
 
+from receipts_xyz.api.v2 import ReceiptsXYZV2GraphQLAPI
+from receipts_xyz.revocation import RevocationSync
+from receipts_xyz.v2.aggregate import SERIES_FIELDS, WorkoutSeriesAggregator
 from receipts_xyz.v2.onchainsummer import get_onchainsummer_workouts
 
 
@@ -16,7 +19,7 @@ from receipts_xyz.v2.onchainsummer import get_onchainsummer_workouts
 #         df = df.drop(columns=["Unnamed: 0"])
 #     df = df.iloc[::-1].reset_index(drop=True)  # Reverse the order to have earliest date first
 #     df['datetime'] = pd.date_range(end='2024-08-12 23:59:59', periods=len(df), freq='10T', tz='US/Eastern')
-#     df['hour'] = df['datetime'].dt.floor('H')
+#     df['hour'] = df['datetime'].dt.floor('h')
     
 #     # Convert intensity time from seconds to minutes
 #     df['total_intensity_time'] = df['total_intensity_time'] / 60
@@ -26,27 +29,61 @@ from receipts_xyz.v2.onchainsummer import get_onchainsummer_workouts
 #     return df
 
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
+MAX_CHART_POINTS = 500
+
+
+class OnchainSummerDataProvider:
+    """Keeps pre-aggregated workout snapshots in memory and only fetches
+    attestations newer than the latest `time` already held.
+    """
+    
+    def __init__(self, tz: str = "US/Eastern") -> None:
+        self.tz = pytz.timezone(tz)
+        self.aggregator = WorkoutSeriesAggregator(tz=self.tz)
+        # revoked snapshots are dropped from the aggregates on every refresh
+        self.revocations = RevocationSync(
+            attesters=[ReceiptsXYZV2GraphQLAPI().receiptsxyz_address]
+        )
+        self.revocations.register(self.aggregator.remove)
+        
+    @property
+    def last_time(self) -> Optional[int]:
+        if self.aggregator.latest is None:
+            return None
+        return self.aggregator.latest.time
+        
+    def refresh(self) -> int:
+        # `gte` on the last seen time, so attestations landing in the same
+        # second are not missed. Re-adding a snapshot is a no-op.
+        workouts = get_onchainsummer_workouts(start_timestamp=self.last_time)
+        updated = self.aggregator.add(workouts)
+        self.revocations.sync()
+        return updated
+    
+    def chart_data(self, bucket: str = "hour", max_points: int = MAX_CHART_POINTS) -> dict:
+        series = {}
+        for field in SERIES_FIELDS:
+            xs, ys = self.aggregator.series(field, bucket=bucket, max_points=max_points)
+            # one vectorized conversion per series
+            series[field] = (pd.to_datetime(xs, unit="s", utc=True).tz_convert(self.tz), ys)
+        
+        latest = self.aggregator.latest
+        return {
+            "latest": latest.to_json() if latest is not None else None,
+            "series": series,
+        }
+
+
+@st.cache_resource
+def get_data_provider() -> OnchainSummerDataProvider:
+    return OnchainSummerDataProvider()
+
+
+@st.cache_data(ttl=300)  # Cache for 5 minutes, refreshes are incremental
 def load_data():
-    workouts = get_onchainsummer_workouts()
-    df = pd.DataFrame([_w.to_json() for _w in workouts])
-    
-    use_col = [
-        "time",
-        "total_participants", "total_moving_time", "total_run_distance", 
-        "total_bike_distance", "total_strength_time", "total_intensity_time"
-    ]
-    df = df[use_col]
-    
-    df["datetime"] = df["time"].map(lambda x: datetime.fromtimestamp(x, pytz.timezone("US/Eastern")))
-    df['hour'] = df['datetime'].dt.floor('H')
-    
-    # Convert intensity time from seconds to minutes
-    df['total_intensity_time'] = df['total_intensity_time'] / 60
-    
-    df = df.rename(columns={'total_participants': '# participants'})
-    
-    return df
+    provider = get_data_provider()
+    provider.refresh()
+    return provider.chart_data()
 
 # Visualization components
 def create_progress_gauge(current_intensity, target_intensity):
@@ -73,22 +110,23 @@ def create_progress_gauge(current_intensity, target_intensity):
     return fig
 
 
-def create_time_series_plot(df, metric):
-    y_label = metric.replace('_', ' ').title()
+def create_time_series_plot(series, metric, label=None, scale=1):
+    y_label = (label or metric).replace('_', ' ').title()
     if 'time' in metric:
         y_label += ' (mins)'
     elif 'distance' in metric:
         y_label += ' (km)'
     
-    fig = px.line(df, x='hour', y=metric, title=f'{y_label} Over Time')
-    fig.update_layout(yaxis_title=y_label)
+    xs, ys = series
+    fig = go.Figure(go.Scatter(x=xs, y=[_y / scale for _y in ys], mode='lines'))
+    fig.update_layout(title=f'{y_label} Over Time', xaxis_title='hour', yaxis_title=y_label)
     fig.update_xaxes(rangeslider_visible=True)
     return fig
 
-def create_time_comparison_plot(df):
+def create_time_comparison_plot(moving_series, strength_series):
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=df['hour'], y=df['total_moving_time'] // 60, name='Moving Time'))
-    fig.add_trace(go.Scatter(x=df['hour'], y=df['total_strength_time'] // 60, name='Strength Time'))
+    fig.add_trace(go.Scatter(x=moving_series[0], y=[_y // 60 for _y in moving_series[1]], name='Moving Time'))
+    fig.add_trace(go.Scatter(x=strength_series[0], y=[_y // 60 for _y in strength_series[1]], name='Strength Time'))
     
     fig.update_layout(
         title='Moving Time vs Strength Time Over Time',
@@ -122,12 +160,18 @@ def calculate_time_left(end_date):
 def main():
     st.title('Onchain Summer Challenge Dashboard')
     
-    df = load_data()
+    data = load_data()
+    latest = data["latest"]
+    series = data["series"]
     st.write(f"Last updated: {datetime.now(pytz.timezone('US/Eastern')).strftime('%Y-%m-%d %H:%M:%S')} ET")
+    
+    if latest is None:
+        st.write("No workouts attested yet.")
+        return
 
     # Section 1: Main Objective Plot
     st.header('Progress Towards 50,000 Intensity Minutes')
-    current_intensity = df['total_intensity_time'].iloc[-1]
+    current_intensity = latest['total_intensity_time'] / 60
     target_intensity = 50000
     fig_progress = create_progress_gauge(current_intensity, target_intensity)
     st.plotly_chart(fig_progress, use_container_width=True)
@@ -140,41 +184,44 @@ def main():
     time_left_message = calculate_time_left(end_date)
     st.write(time_left_message)
 
-    # Section 2: Data over time
+    # Section 2: Data over time (hourly snapshots, downsampled server-side)
     st.header('Data Over Time')
-    df_hourly = df.groupby('hour').last().reset_index()
     
     # Plot total participants over time
-    fig_participants = create_time_series_plot(df_hourly, '# participants')
+    fig_participants = create_time_series_plot(
+        series['total_participants'], 'total_participants', label='# participants'
+    )
     st.plotly_chart(fig_participants, use_container_width=True)
     
     # Plot moving time vs strength time
-    fig_time_comparison = create_time_comparison_plot(df_hourly)
+    fig_time_comparison = create_time_comparison_plot(
+        series['total_moving_time'], series['total_strength_time']
+    )
     st.plotly_chart(fig_time_comparison, use_container_width=True)
     
     # Plot total intensity time over time
-    fig_intensity = create_time_series_plot(df_hourly, 'total_intensity_time')
+    fig_intensity = create_time_series_plot(
+        series['total_intensity_time'], 'total_intensity_time', scale=60
+    )
     st.plotly_chart(fig_intensity, use_container_width=True)
     
     # Plot run and bike distances over time
-    fig_run = create_time_series_plot(df_hourly, 'total_run_distance')
+    fig_run = create_time_series_plot(series['total_run_distance'], 'total_run_distance')
     st.plotly_chart(fig_run, use_container_width=True)
     
-    fig_bike = create_time_series_plot(df_hourly, 'total_bike_distance')
+    fig_bike = create_time_series_plot(series['total_bike_distance'], 'total_bike_distance')
     st.plotly_chart(fig_bike, use_container_width=True)
 
     # Section 3: Exercise Type Distribution
     st.header('Exercise Type Distribution')
-    last_row = df.iloc[-1]
-    moving_time = last_row['total_moving_time']
-    strength_time = last_row['total_strength_time']
+    moving_time = latest['total_moving_time']
+    strength_time = latest['total_strength_time']
 
-    exercise_data = pd.DataFrame({
-        'Exercise Type': ['Moving (Running/Cycling)', 'Strength'],
-        'Time (minutes)': [moving_time, strength_time]
-    })
-
-    fig_pie = px.pie(exercise_data, values='Time (minutes)', names='Exercise Type', title='Distribution of Exercise Types')
+    fig_pie = go.Figure(go.Pie(
+        labels=['Moving (Running/Cycling)', 'Strength'],
+        values=[moving_time, strength_time],
+    ))
+    fig_pie.update_layout(title='Distribution of Exercise Types')
     st.plotly_chart(fig_pie, use_container_width=True)
 
 if __name__ == "__main__":
@@ -0,0 +1,32 @@
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .v1.user import get_user_workouts, get_users_workouts
+    from .v1.weekly import get_attested_workouts_for_weeks, get_weekly_attested_workouts
+    from .v2.onchainsummer import get_onchainsummer_workouts
+
+
+# public name -> module defining it, imported on first access so that
+# `import receipts_xyz` does not pay for pydantic, requests or web3
+_LAZY_ATTRIBUTES = {
+    "get_weekly_attested_workouts": ".v1.weekly",
+    "get_attested_workouts_for_weeks": ".v1.weekly",
+    "get_user_workouts": ".v1.user",
+    "get_users_workouts": ".v1.user",
+    "get_onchainsummer_workouts": ".v2.onchainsummer",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,93 @@
+import argparse
+import json
+import logging
+
+from .export import EXPORT_FORMATS, EXPORT_SCHEMAS, export_attestations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m receipts_xyz")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    export_parser = subparsers.add_parser(
+        "export",
+        help="Stream attestations to NDJSON or Parquet, resuming from the last checkpoint"
+    )
+    export_parser.add_argument("schema", choices=list(EXPORT_SCHEMAS))
+    export_parser.add_argument("output", help="Output file (ndjson) or directory (parquet)")
+    export_parser.add_argument("--format", dest="output_format", choices=EXPORT_FORMATS, default="ndjson")
+    export_parser.add_argument("--start", dest="start_timestamp", type=int, default=None)
+    export_parser.add_argument("--end", dest="end_timestamp", type=int, default=None)
+    export_parser.add_argument("--batch-size", type=int, default=1000)
+    export_parser.add_argument("--checkpoint", dest="checkpoint_path", default=None)
+    
+    backfill_parser = subparsers.add_parser(
+        "backfill",
+        help="Backfill attestations with worker processes sharing a SQLite job table"
+    )
+    backfill_subparsers = backfill_parser.add_subparsers(dest="backfill_command", required=True)
+    
+    plan_parser = backfill_subparsers.add_parser("plan", help="Split a time range into work units")
+    plan_parser.add_argument("db", help="SQLite job table")
+    plan_parser.add_argument("--schema", dest="schemas", action="append", choices=list(EXPORT_SCHEMAS),
+                             help="Schema to backfill, can be repeated (default: all)")
+    plan_parser.add_argument("--start", dest="start_timestamp", type=int, required=True)
+    plan_parser.add_argument("--end", dest="end_timestamp", type=int, default=None)
+    plan_parser.add_argument("--unit-seconds", type=int, default=7 * 86400)
+    
+    work_parser = backfill_subparsers.add_parser("work", help="Process work units until none are left")
+    work_parser.add_argument("db", help="SQLite job table")
+    work_parser.add_argument("output_dir", help="Output directory")
+    work_parser.add_argument("--workers", type=int, default=4, help="Worker processes on this host")
+    work_parser.add_argument("--format", dest="output_format", choices=EXPORT_FORMATS, default="ndjson")
+    work_parser.add_argument("--batch-size", type=int, default=1000)
+    work_parser.add_argument("--lease-seconds", type=float, default=300)
+    
+    status_parser = backfill_subparsers.add_parser("status", help="Show the progress of the work units")
+    status_parser.add_argument("db", help="SQLite job table")
+    
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    
+    if args.command == "export":
+        rows = export_attestations(
+            schema=args.schema,
+            output=args.output,
+            output_format=args.output_format,
+            start_timestamp=args.start_timestamp,
+            end_timestamp=args.end_timestamp,
+            batch_size=args.batch_size,
+            checkpoint_path=args.checkpoint_path,
+        )
+        print(f"Exported {rows} rows to {args.output}")
+    elif args.command == "backfill":
+        from .backfill import BackfillCoordinator, run_backfill
+        
+        if args.backfill_command == "plan":
+            coordinator = BackfillCoordinator(args.db)
+            created = coordinator.plan(
+                schemas=args.schemas or list(EXPORT_SCHEMAS),
+                start_timestamp=args.start_timestamp,
+                end_timestamp=args.end_timestamp,
+                unit_seconds=args.unit_seconds,
+            )
+            coordinator.close()
+            print(f"Planned {created} new work units in {args.db}")
+        elif args.backfill_command == "work":
+            progress = run_backfill(
+                args.db,
+                args.output_dir,
+                workers=args.workers,
+                output_format=args.output_format,
+                batch_size=args.batch_size,
+                lease_seconds=args.lease_seconds,
+            )
+            print(json.dumps(progress, indent=2))
+        else:
+            coordinator = BackfillCoordinator(args.db)
+            print(json.dumps(coordinator.progress(), indent=2))
+            coordinator.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .schema.v1 import SingleWorkoutReceipt
+
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+NUMERIC_FIELDS = ["moving_time", "distance", "elevation_gain", "utc_time"]
+
+# parsed fields that may be None, kept as float with NaN
+NULLABLE_FIELDS = ["speed", "local_timestamp", "utc_offset"]
+
+
+def to_columns(
+    workouts: Union[Iterable[SingleWorkoutReceipt], Dict[str, list]]
+) -> Dict[str, np.ndarray]:
+    """Converts workouts to column arrays, with the derived fields added.
+
+    Args:
+        workouts: `SingleWorkoutReceipt`s, or a columnar table (column name
+            -> values) such as `get_users_workouts(..., as_table=True)`.
+
+    Returns:
+        A dictionary of column name -> array, including `region`,
+        `local_hour` (-1 if unknown) and `pace` (seconds per km).
+    """
+    if isinstance(workouts, dict):
+        table = workouts
+    else:
+        rows = [_w.to_json() for _w in workouts]
+        table = {_c: [_r[_c] for _r in rows] for _c in (rows[0] if rows else [])}
+
+    columns = {}
+    for name, values in table.items():
+        if name in NUMERIC_FIELDS:
+            columns[name] = np.asarray(values, dtype=np.int64)
+        elif name in NULLABLE_FIELDS:
+            columns[name] = np.asarray(values, dtype=np.float64)
+        else:
+            # `receipt_map` may be None
+            columns[name] = np.asarray(values, dtype=object if name == "receipt_map" else None)
+
+    length = len(next(iter(table.values()))) if table else 0
+    empty = np.zeros(length, dtype=str)
+    # use the fields parsed at ingest, and only parse the strings of
+    # tables that lack them
+    if "region" not in columns:
+        columns["region"] = timezone_region(columns.get("timezone", empty))
+    if "local_timestamp" in columns:
+        local_timestamps = columns["local_timestamp"]
+        known = ~np.isnan(local_timestamps)
+        # -1 where the local time is unknown
+        columns["local_hour"] = np.full(len(local_timestamps), -1, dtype=np.int64)
+        columns["local_hour"][known] = local_timestamps[known].astype(np.int64) // 3600 % 24
+    else:
+        columns["local_hour"] = local_hour(columns.get("local_time", empty))
+    if "speed" in columns:
+        columns["pace"] = speed_to_pace(columns["speed"])
+    else:
+        columns["pace"] = pace(columns.get("average_speed", empty))
+    return columns
+
+
+def timezone_region(timezones: Sequence[str]) -> np.ndarray:
+    """Region of each timezone, e.g. "Asia" for "(GMT+07:00) Asia/Ho_Chi_Minh"."""
+    # there are far fewer distinct timezones than workouts
+    unique, inverse = np.unique(np.asarray(timezones, dtype=str), return_inverse=True)
+    regions = np.array(
+        [_t.split()[1].split("/")[0] if len(_t.split()) > 1 else "" for _t in unique],
+        dtype=str
+    )
+    return regions[inverse].reshape(-1)
+
+
+def local_hour(local_times: Sequence[str]) -> np.ndarray:
+    """Hour of day (0-23) of each "%Y-%m-%dT%H:%M:%SZ" local time."""
+    local_times = np.asarray(local_times, dtype=str)
+    if len(local_times) == 0:
+        return np.zeros(0, dtype=np.int64)
+    # drop the trailing "Z", the time is already local
+    seconds = local_times.astype("U19").astype("datetime64[s]").astype(np.int64)
+    return seconds // 3600 % 24
+
+
+def pace(average_speeds: Sequence[str]) -> np.ndarray:
+    """Pace in seconds per km from `average_speed` (m/s), NaN where unknown."""
+    speeds = np.asarray(average_speeds, dtype=str)
+    return speed_to_pace(np.where(speeds == "null", "nan", speeds).astype(np.float64))
+
+
+def speed_to_pace(speeds: Sequence[float]) -> np.ndarray:
+    """Pace in seconds per km from speeds in m/s, NaN where unknown."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        paces = 1000 / np.asarray(speeds, dtype=np.float64)
+    paces[~np.isfinite(paces)] = np.nan
+    return paces
+
+
+def summarize(
+    values: Sequence[float],
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES
+) -> dict:
+    """Count, mean, standard deviation, min, max and percentiles of the
+    values, ignoring NaN."""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return {"count": 0}
+
+    summary = {
+        "count": len(values),
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+    }
+    for percentile, value in zip(percentiles, np.percentile(values, percentiles)):
+        summary[f"p{percentile:g}"] = float(value)
+    return summary
+
+
+def histogram(
+    values: Sequence[float],
+    bins: Union[int, Sequence[float]] = 20,
+    value_range: Optional[Tuple[float, float]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Histogram of the values, ignoring NaN.
+
+    Returns:
+        A tuple of the counts and the bin edges.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return np.histogram(values[~np.isnan(values)], bins=bins, range=value_range)
+
+
+def _group(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # distinct keys, the order sorting rows by key and the group boundaries
+    groups, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    order = np.argsort(inverse, kind="stable")
+    splits = np.cumsum(np.bincount(inverse, minlength=len(groups)))[:-1]
+    return groups, order, splits
+
+
+def _breakdown(
+    grouping: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    values: np.ndarray,
+    percentiles: Sequence[float]
+) -> Dict[str, dict]:
+    groups, order, splits = grouping
+    split_values = np.split(np.asarray(values, dtype=np.float64)[order], splits)
+    summaries = {
+        str(_g): summarize(_v, percentiles) for _g, _v in zip(groups, split_values)
+    }
+    return dict(sorted(summaries.items(), key=lambda x: -x[1]["count"]))
+
+
+def breakdown(
+    columns: Dict[str, np.ndarray],
+    field: str,
+    by: str = "sport_type",
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES
+) -> Dict[str, dict]:
+    """Summary of `field` for every value of `by`.
+
+    Args:
+        columns: Column arrays from `to_columns`.
+        field: The column to summarize, e.g. "distance".
+        by: The column to group by, e.g. "sport_type" or "region".
+        percentiles: The percentiles to compute.
+
+    Returns:
+        A dictionary of group -> summary, largest group first.
+    """
+    return _breakdown(_group(columns[by]), columns[field], percentiles)
+
+
+def summarize_workouts(
+    workouts: Union[Iterable[SingleWorkoutReceipt], Dict[str, list]],
+    fields: Optional[List[str]] = None,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES
+) -> dict:
+    """Summary statistics of a batch of workouts, overall, per sport type
+    and per region.
+
+    Args:
+        workouts: `SingleWorkoutReceipt`s or a columnar table.
+        fields: The columns to summarize, defaults to distance, elevation
+            gain, moving time and pace.
+        percentiles: The percentiles to compute.
+
+    Returns:
+        A dictionary with the workout count, the overall summaries, the
+        per-sport and per-region summaries, and the workout counts per
+        local hour of day.
+    """
+    columns = to_columns(workouts)
+    fields = fields or ["distance", "elevation_gain", "moving_time", "pace"]
+    if len(columns["pace"]) == 0:
+        return {"count": 0}
+
+    # group once, then summarize every field with the same grouping
+    by_sport_type = _group(columns["sport_type"])
+    by_region = _group(columns["region"])
+    return {
+        "count": len(columns["pace"]),
+        "overall": {_f: summarize(columns[_f], percentiles) for _f in fields},
+        "by_sport_type": {_f: _breakdown(by_sport_type, columns[_f], percentiles) for _f in fields},
+        "by_region": {_f: _breakdown(by_region, columns[_f], percentiles) for _f in fields},
+        "by_local_hour": np.bincount(
+            columns["local_hour"][columns["local_hour"] >= 0], minlength=24
+        ).tolist(),
+    }
@@ -0,0 +1,100 @@
+import re
+from typing import List, Tuple
+
+
+_NAME = re.compile(r"[_A-Za-z][_0-9A-Za-z]*")
+# `alias: field`
+_ALIASED_NAME = re.compile(r"([_A-Za-z][_0-9A-Za-z]*)\s*:\s*([_A-Za-z][_0-9A-Za-z]*)")
+
+
+def _operation_body(query: str) -> str:
+    start = query.find("{")
+    end = query.rfind("}")
+    if start == -1 or end <= start:
+        raise ValueError(f"Not a GraphQL query document:\n\n{query}")
+    return query[start + 1:end]
+
+
+def _alias_top_level_fields(body: str, prefix: str) -> Tuple[str, List[str]]:
+    """Prefixes the result key of every top-level field of a selection set.
+
+    Returns:
+        The rewritten selection set and the original result keys.
+    """
+    output = []
+    keys = []
+    depth = 0
+    i = 0
+    while i < len(body):
+        char = body[i]
+        if char == '"':
+            # copy string literals as they are
+            end = i + 1
+            while body[end] != '"':
+                end += 2 if body[end] == "\\" else 1
+            output.append(body[i:end + 1])
+            i = end + 1
+            continue
+        if char in "({":
+            depth += 1
+        elif char in ")}":
+            depth -= 1
+        elif depth == 0:
+            aliased = _ALIASED_NAME.match(body, i)
+            match = aliased or _NAME.match(body, i)
+            if match is not None:
+                name = match.group(1) if aliased else match.group()
+                field = match.group(2) if aliased else name
+                output.append(f"{prefix}{name}: {field}")
+                keys.append(name)
+                i = match.end()
+                continue
+        output.append(char)
+        i += 1
+    return "".join(output), keys
+
+
+def batch_queries(queries: List[str]) -> Tuple[str, List[List[str]]]:
+    """Merges query documents into one, aliasing the top-level fields of
+    each with a `q<index>_` prefix.
+
+    Only plain queries with inline arguments are supported, no variables
+    or fragments.
+
+    Returns:
+        The merged document and the result keys of every query.
+    """
+    bodies = []
+    keys = []
+    for i, query in enumerate(queries):
+        body, query_keys = _alias_top_level_fields(_operation_body(query), f"q{i}_")
+        bodies.append(body)
+        keys.append(query_keys)
+    return "query Batch {\n" + "\n".join(bodies) + "\n}", keys
+
+
+def split_batch_result(result: dict, keys: List[List[str]]) -> List[dict]:
+    """Splits the response of a `batch_queries` document into one response
+    per query, as if each had been sent on its own."""
+    data = result.get("data") or {}
+    errors = result.get("errors") or []
+    # without data the whole request failed, whatever field the errors name
+    failed = result.get("data") is None
+
+    results = []
+    for i, query_keys in enumerate(keys):
+        prefix = f"q{i}_"
+        query_result = {"data": {_k: data.get(f"{prefix}{_k}") for _k in query_keys}}
+
+        query_errors = []
+        for error in errors:
+            path = error.get("path") or []
+            if path and isinstance(path[0], str) and path[0].startswith(prefix):
+                query_errors.append({**error, "path": [path[0][len(prefix):]] + path[1:]})
+            elif not path or failed:
+                # not tied to a field, so it concerns every query
+                query_errors.append(error)
+        if query_errors:
+            query_result["errors"] = query_errors
+        results.append(query_result)
+    return results
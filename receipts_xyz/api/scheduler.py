@@ -0,0 +1,126 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+
+class Priority:
+    INTERACTIVE = 0
+    DEFAULT = 1
+    BULK = 2
+
+
+class RequestScheduler:
+    """Process-wide gate for outgoing requests.
+
+    Requests wait in a priority queue until the token bucket has a token and
+    fewer than `max_concurrency` requests are in flight. Requests of the same
+    priority are served in arrival order.
+    """
+
+    def __init__(self, rate: float = 5.0, burst: int = 5, max_concurrency: int = 4) -> None:
+        """
+        Args:
+            rate: Tokens added per second, i.e. the sustained request rate.
+            burst: Size of the token bucket.
+            max_concurrency: Maximum number of requests in flight.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+
+        self._condition = threading.Condition()
+        self._queue: list = []
+        self._counter = itertools.count()
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._active = 0
+        self._waits: Dict[int, list] = {}
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _acquire(self, priority: int) -> None:
+        ticket = (priority, next(self._counter))
+        enqueued_at = time.monotonic()
+        with self._condition:
+            heapq.heappush(self._queue, ticket)
+            while True:
+                self._refill()
+                if self._queue[0] == ticket and self._active < self.max_concurrency:
+                    if self._tokens >= 1:
+                        break
+                    # wait until the next token is due
+                    self._condition.wait((1 - self._tokens) / self.rate)
+                else:
+                    self._condition.wait()
+
+            heapq.heappop(self._queue)
+            self._tokens -= 1
+            self._active += 1
+
+            wait = time.monotonic() - enqueued_at
+            stats = self._waits.setdefault(priority, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += wait
+            stats[2] = max(stats[2], wait)
+            # the next ticket may be able to go as well
+            self._condition.notify_all()
+
+    def _release(self) -> None:
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, priority: int = Priority.DEFAULT) -> Iterator[None]:
+        """Blocks until the request may be sent, and holds a slot until done."""
+        self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        """Queue depth, in-flight requests and wait times (seconds) per priority."""
+        with self._condition:
+            depth: Dict[int, int] = {}
+            for priority, _ in self._queue:
+                depth[priority] = depth.get(priority, 0) + 1
+            return {
+                "queue_depth": len(self._queue),
+                "queue_depth_by_priority": depth,
+                "active": self._active,
+                "waits": {
+                    priority: {
+                        "count": count,
+                        "mean": total / count,
+                        "max": longest,
+                    }
+                    for priority, (count, total, longest) in self._waits.items()
+                },
+            }
+
+
+_scheduler: Optional[RequestScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """Returns the process-wide scheduler, created with defaults on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
+
+
+def set_scheduler(scheduler: RequestScheduler) -> None:
+    """Replaces the process-wide scheduler, e.g. to change its limits."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
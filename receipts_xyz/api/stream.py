@@ -0,0 +1,84 @@
+import codecs
+import json
+import re
+import time
+from typing import Iterable, Iterator
+
+from ..tracing import get_tracer
+
+
+_VALUE_START = re.compile(r"\s*:\s*(\S)")
+
+
+def iter_json_array(chunks: Iterable[bytes], key: str = "attestations") -> Iterator[dict]:
+    """Yields the items of the first JSON array under `key` as they arrive.
+
+    Only the bytes of the item being decoded are buffered, so memory stays
+    flat no matter how large the whole document is.
+
+    Args:
+        chunks: Raw chunks of a JSON document, e.g. `Response.iter_content()`.
+        key: Name of the field holding the array.
+
+    Yields:
+        The decoded items of the array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer = ""
+    tracer = get_tracer()
+
+    def read_more() -> bool:
+        nonlocal buffer
+        for chunk in chunks:
+            if chunk:
+                buffer += text_decoder.decode(chunk)
+                return True
+        return False
+
+    def unexpected_response() -> Exception:
+        # drain the rest, so the error carries the whole response
+        while read_more():
+            pass
+        return Exception(f"Unexpected GraphQL response, no `{key}` array found:\n\n{buffer}")
+
+    # find the opening bracket of the array
+    marker = f'"{key}"'
+    while True:
+        idx = buffer.find(marker)
+        if idx != -1:
+            match = _VALUE_START.match(buffer, idx + len(marker))
+            if match is not None:
+                if match.group(1) != "[":
+                    raise unexpected_response()
+                buffer = buffer[match.end():]
+                break
+        if not read_more():
+            raise unexpected_response()
+
+    while True:
+        # skip separators between items
+        buffer = buffer.lstrip(", \t\r\n")
+        if not buffer:
+            if not read_more():
+                raise Exception("Unexpected end of GraphQL response")
+            continue
+        if buffer[0] == "]":
+            return
+
+        start = time.time_ns() if tracer is not None else 0
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            # the item is incomplete, wait for more bytes
+            if not read_more():
+                raise
+            continue
+
+        if tracer is not None:
+            # only decodes that succeed, an item cut off at a chunk boundary
+            # is not an error
+            tracer.add_span("decode", start, time.time_ns())
+        buffer = buffer[end:]
+        yield item
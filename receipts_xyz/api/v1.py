@@ -1,25 +1,217 @@
-import requests
+import json
 import logging
+import time
 
-from typing import List, Optional
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
+from ..cache import ResponseCache, get_response_cache
 from ..const import LeaderBoardFilterV1
+from ..tracing import span
+from .batch import batch_queries, split_batch_result
+from .scheduler import Priority, get_scheduler
+from .stream import iter_json_array
+
+if TYPE_CHECKING:
+    from ..schema.base import WatchCursor
+
+# `requests` and the pydantic schemas are imported on first use, so that
+# importing the package stays cheap
+
+
+# attestations of one schema, with `condition` an optional `time_condition`
+SCHEMA_ATTESTATIONS_QUERY = """
+query Attestations {{
+    attestations(
+        orderBy: {{time: desc}},
+        where: {{
+            {condition}
+            schema: {{
+                is: {{
+                    id: {{
+                        equals: "{schema_id}"
+                    }}
+                }}
+            }},
+            attester: {{
+                equals: "{receiptsxyz_address}"
+            }}
+        }},
+        take: {batch_size},
+        skip: {skip}
+    ) {{
+        id
+        time
+        txid
+        recipient
+        data
+        decodedDataJson
+        revoked
+        ipfsHash
+        schema {{
+            id
+        }}
+    }}
+}}
+"""
+
+
+def time_condition(start_timestamp: Optional[int] = None, end_timestamp: Optional[int] = None) -> str:
+    """Builds the `time` filter of a `where` clause, empty if no bound is given."""
+    time_filter = []
+    if start_timestamp is not None:
+        time_filter.append(f"gte: {start_timestamp}")
+    if end_timestamp is not None:
+        time_filter.append(f"lte: {end_timestamp}")
+    return f"time: {{{', '.join(time_filter)}}}," if time_filter else ""
+
+
+def is_immutable_window(start_timestamp: Optional[int], end_timestamp: Optional[int]) -> bool:
+    """Whether `[start_timestamp, end_timestamp]` lies in a week that has ended."""
+    if start_timestamp is None or end_timestamp is None:
+        return False
+    from ..schema.base import WeekInterval
+    
+    interval = WeekInterval.from_timestamp(start_timestamp)
+    return interval.is_closed and interval.contains(start_timestamp, end_timestamp)
 
 
 class ReceiptsXYZV1GraphQLAPI:
     
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        priority: int = Priority.DEFAULT
+    ) -> None:
         self.graphql_url = "https://base.easscan.org/graphql"
         self.receiptsxyz_address = "0x77a3b79a2De700AfcfC761fED837a67D7d8fAe1B"
+        self.schema_id = {
+            "single_workout": "0x48d9973eb6863978c104f85dc6864e827fc0f72c4083dd853171e0bf034f8774",
+            "week_to_date": "0xcd6475d55ff914b51faf41f8f85a6bfe27875fc87eaa7d50762cf6c89050adac",
+            "user": "0x0f575d6100ca5a0d82b037f97673b97ebb8bb55848aa8b861ee4a843e247c1d2",
+        }
+        # falls back to the process-wide cache, see `enable_response_cache`
+        self.cache = cache
+        # scheduling priority of this client's requests, see `get_scheduler`
+        self.priority = priority
         
-    def request_graphql(self, query: str):
-        r = requests.post(self.graphql_url, json={"query": query})
+    def request_graphql(
+        self,
+        query: str,
+        variables: Optional[dict] = None,
+        immutable: bool = False,
+        use_cache: bool = True,
+        priority: Optional[int] = None
+    ):
+        cache = (self.cache or get_response_cache()) if use_cache else None
+        if cache is not None:
+            key = cache.make_key(query, variables)
+            result = cache.get(key)
+            if result is not None:
+                logging.info(f"Response cache hit: {key}")
+                return result
+        
+        payload = {"query": query}
+        if variables is not None:
+            payload["variables"] = variables
+        result = self._post_graphql(payload, priority=priority)
+        if cache is not None and "errors" not in result:
+            cache.set(key, result, immutable=immutable)
+        return result
+    
+    def _post_graphql(self, payload: dict, priority: Optional[int] = None, queries: int = 1) -> dict:
+        import requests
+        
+        with get_scheduler().slot(self.priority if priority is None else priority), \
+                span("fetch_page", url=self.graphql_url, streamed=False, queries=queries):
+            r = requests.post(self.graphql_url, json=payload)
         
         if r.status_code != 200:
             logging.error(f"GraphQL request failed with status code {r.status_code}")
             raise Exception(f"GraphQL request failed with status code {r.status_code}\n\n{r.text}")
         
-        return r.json()
+        with span("decode", bytes=len(r.content)):
+            return r.json()
+    
+    def request_graphql_batch(
+        self,
+        queries: List[str],
+        immutable: Union[bool, List[bool]] = False,
+        use_cache: bool = True,
+        priority: Optional[int] = None,
+        max_queries: int = 10,
+    ) -> List[dict]:
+        """Sends several queries in as few round trips as possible.
+        
+        Up to `max_queries` queries are merged into one document, with their
+        top-level fields aliased, and the response is split back into one
+        result per query. Cached results are not fetched again.
+        
+        Args:
+            queries: Query documents with inline arguments, no variables.
+            immutable: Whether the results can be cached with no expiry,
+                for all queries or per query.
+            use_cache: Whether to use the response cache.
+            priority: Scheduling priority, defaults to the client's.
+            max_queries: Maximum number of queries per request.
+        
+        Returns:
+            The results, in the order of `queries`, each as `request_graphql`
+            would return it.
+        """
+        if isinstance(immutable, bool):
+            immutable = [immutable] * len(queries)
+        
+        cache = (self.cache or get_response_cache()) if use_cache else None
+        results: List[Optional[dict]] = [None] * len(queries)
+        keys = [cache.make_key(_q) if cache is not None else None for _q in queries]
+        if cache is not None:
+            for i, key in enumerate(keys):
+                results[i] = cache.get(key)
+        
+        missing = [i for i, _r in enumerate(results) if _r is None]
+        for start in range(0, len(missing), max_queries):
+            group = missing[start:start + max_queries]
+            document, result_keys = batch_queries([queries[_i] for _i in group])
+            logging.info(f"Fetching {len(group)} queries in one request")
+            result = self._post_graphql({"query": document}, priority=priority, queries=len(group))
+            for i, query_result in zip(group, split_batch_result(result, result_keys)):
+                results[i] = query_result
+                if cache is not None and "errors" not in query_result:
+                    cache.set(keys[i], query_result, immutable=immutable[i])
+        return results
+    
+    def request_graphql_stream(
+        self,
+        query: str,
+        key: str = "attestations",
+        immutable: bool = False,
+        use_cache: bool = True,
+        chunk_size: int = 64 * 1024,
+        priority: Optional[int] = None
+    ) -> Iterator[dict]:
+        """Same as `request_graphql`, but yields the items of the `key` array
+        while the response is still being read."""
+        cache = (self.cache or get_response_cache()) if use_cache else None
+        if cache is not None:
+            # cached responses are stored whole, so go through the cache
+            result = self.request_graphql(query, immutable=immutable, priority=priority)
+            yield from result.get("data", {}).get(key) or []
+            return
+        
+        import requests
+        
+        # the slot is held until the whole response has been read
+        with get_scheduler().slot(self.priority if priority is None else priority):
+            # only until the response headers arrive, the body is decoded as it streams in
+            with span("fetch_page", url=self.graphql_url, streamed=True):
+                r = requests.post(self.graphql_url, json={"query": query}, stream=True)
+            
+            with r:
+                if r.status_code != 200:
+                    logging.error(f"GraphQL request failed with status code {r.status_code}")
+                    raise Exception(f"GraphQL request failed with status code {r.status_code}\n\n{r.text}")
+                
+                yield from iter_json_array(r.iter_content(chunk_size=chunk_size), key=key)
     
     def query_attestation(self, uid: str) -> dict:
         query = f"""
@@ -36,6 +228,7 @@ class ReceiptsXYZV1GraphQLAPI:
                 }}
             ) {{
                 id
+                time
                 txid
                 data
                 decodedDataJson
@@ -48,12 +241,159 @@ class ReceiptsXYZV1GraphQLAPI:
         }}
         """
         
-        result = self.request_graphql(query)
+        result = self.request_graphql(query, priority=Priority.INTERACTIVE)
         return result
 
-    def fetch_all_data(self, base_query: str, data_path: list, batch_size: int = 8000, **kwargs) -> list:
+    def iter_all_data(
+        self,
+        base_query: str,
+        data_path: list,
+        batch_size: int = 8000,
+        use_cache: bool = True,
+        skip: int = 0,
+        pages_per_request: int = 1,
+        **kwargs
+    ) -> Iterator[list]:
+        """Yields paged results one batch at a time, so callers can stop paging early.
+        
+        Paging starts at `skip`, which allows resuming an interrupted crawl.
+        With `pages_per_request` > 1, that many consecutive pages are fetched
+        in one round trip, at the cost of some empty pages past the end.
+        """
+        has_more_data = True
+        # attestations of a week that has ended can no longer change
+        immutable = is_immutable_window(kwargs.get("start_timestamp"), kwargs.get("end_timestamp"))
+        
+        while has_more_data:
+            queries = [
+                base_query.format(
+                    batch_size=batch_size, 
+                    skip=skip + _p * batch_size, 
+                    **kwargs
+                ) for _p in range(pages_per_request)
+            ]
+            logging.info(f"Fetching batch with skip value: {skip}")
+            if pages_per_request == 1:
+                results = [self.request_graphql(queries[0], immutable=immutable, use_cache=use_cache)]
+            else:
+                results = self.request_graphql_batch(
+                    queries, immutable=immutable, use_cache=use_cache, max_queries=pages_per_request
+                )
+            
+            for result in results:
+                # Navigate through the nested dictionary to get to the data
+                data = result
+                for key in data_path:
+                    data = data.get(key, {})
+                if not data and "errors" in result:
+                    # a failed page is not the end of the data
+                    raise Exception(f"GraphQL query failed:\n\n{result['errors']}")
+                
+                if data:
+                    skip += batch_size
+                    has_more_data = len(data) == batch_size
+                    logging.info(f"Fetched {len(data)} records in this batch.")
+                    yield data
+                else:
+                    has_more_data = False
+                    logging.warning("No more data available or unexpected response format.")
+                if not has_more_data:
+                    break
+
+    def fetch_all_data(
+        self,
+        base_query: str,
+        data_path: list,
+        batch_size: int = 8000,
+        use_cache: bool = True,
+        pages_per_request: int = 1,
+        **kwargs
+    ) -> list:
         all_results = []
-        skip = 0
+        for data in self.iter_all_data(
+            base_query,
+            data_path,
+            batch_size=batch_size,
+            use_cache=use_cache,
+            pages_per_request=pages_per_request,
+            **kwargs
+        ):
+            all_results.extend(data)
+        
+        logging.info(f"Total records fetched: {len(all_results)}")
+        return all_results
+    
+    def fetch_all_data_batched(
+        self,
+        base_query: str,
+        data_path: list,
+        params: List[dict],
+        batch_size: int = 8000,
+        use_cache: bool = True,
+        queries_per_request: int = 10,
+    ) -> List[list]:
+        """Runs several paged crawls of the same query side by side, fetching
+        the next page of up to `queries_per_request` crawls per round trip.
+        
+        Args:
+            base_query: Query template with `batch_size` and `skip` fields.
+            data_path: Path of the records in a response.
+            params: Template fields of every crawl, e.g. one time window or
+                one chunk of addresses each.
+            batch_size: Number of records per page.
+            use_cache: Whether to use the response cache.
+            queries_per_request: Maximum number of pages per request.
+        
+        Returns:
+            The records of every crawl, in the order of `params`.
+        """
+        all_results: List[list] = [[] for _ in params]
+        skips = [0] * len(params)
+        active = list(range(len(params)))
+        
+        while active:
+            queries = [
+                base_query.format(batch_size=batch_size, skip=skips[_i], **params[_i])
+                for _i in active
+            ]
+            immutable = [
+                is_immutable_window(params[_i].get("start_timestamp"), params[_i].get("end_timestamp"))
+                for _i in active
+            ]
+            results = self.request_graphql_batch(
+                queries, immutable=immutable, use_cache=use_cache, max_queries=queries_per_request
+            )
+            
+            still_active = []
+            for i, result in zip(active, results):
+                data = result
+                for key in data_path:
+                    data = data.get(key, {})
+                if not data and "errors" in result:
+                    raise Exception(f"GraphQL query failed:\n\n{result['errors']}")
+                
+                all_results[i].extend(data or [])
+                skips[i] += batch_size
+                if data and len(data) == batch_size:
+                    still_active.append(i)
+            active = still_active
+            logging.info(f"{len(active)} crawls have more pages")
+        
+        logging.info(f"Total records fetched: {sum(len(_r) for _r in all_results)}")
+        return all_results
+    
+    def iter_all_records(
+        self,
+        base_query: str,
+        data_path: list,
+        batch_size: int = 8000,
+        use_cache: bool = True,
+        skip: int = 0,
+        **kwargs
+    ) -> Iterator[dict]:
+        """Yields paged results record by record, parsing each page as it streams in."""
+        immutable = is_immutable_window(kwargs.get("start_timestamp"), kwargs.get("end_timestamp"))
+        total = 0
         has_more_data = True
         
         while has_more_data:
@@ -62,25 +402,20 @@ class ReceiptsXYZV1GraphQLAPI:
                 skip=skip, 
                 **kwargs
             )
-            logging.info(f"Fetching batch with skip value: {skip}")
-            result = self.request_graphql(query)
+            logging.info(f"Streaming batch with skip value: {skip}")
+            count = 0
+            for record in self.request_graphql_stream(
+                query, key=data_path[-1], immutable=immutable, use_cache=use_cache
+            ):
+                count += 1
+                yield record
             
-            # Navigate through the nested dictionary to get to the data
-            data = result
-            for key in data_path:
-                data = data.get(key, {})
-            
-            if data:
-                all_results.extend(data)
-                skip += batch_size
-                has_more_data = len(data) == batch_size
-                logging.info(f"Fetched {len(data)} records in this batch.")
-            else:
-                has_more_data = False
-                logging.warning("No more data available or unexpected response format.")
+            skip += batch_size
+            total += count
+            has_more_data = count == batch_size
+            logging.info(f"Fetched {count} records in this batch.")
         
-        logging.info(f"Total records fetched: {len(all_results)}")
-        return all_results
+        logging.info(f"Total records fetched: {total}")
     
     def query_user_workouts(self, address: str) -> dict:
         base_query = """
@@ -130,6 +465,14 @@ class ReceiptsXYZV1GraphQLAPI:
         start_timestamp: int,
         end_timestamp: int
     ) -> dict:
+        return list(self.iter_workouts_with_interval(start_timestamp, end_timestamp))
+    
+    def iter_workouts_with_interval(
+        self,
+        start_timestamp: int,
+        end_timestamp: int,
+        batch_size: int = 8000
+    ) -> Iterator[dict]:
         assert start_timestamp < end_timestamp
         base_query = """
         query Attestations {{
@@ -167,13 +510,68 @@ class ReceiptsXYZV1GraphQLAPI:
         """
         
         data_path = ['data', 'attestations']
-        results = self.fetch_all_data(
+        return self.iter_all_records(
             base_query, 
             data_path, 
+            batch_size=batch_size,
             start_timestamp=start_timestamp,
             end_timestamp=end_timestamp
         )
-        return results
+    
+    def iter_schemas_with_interval(
+        self,
+        schema_ids: List[str],
+        start_timestamp: int,
+        end_timestamp: int,
+        batch_size: int = 8000
+    ) -> Iterator[dict]:
+        """Yields the attestations of several schemas in one paged crawl."""
+        assert start_timestamp < end_timestamp
+        base_query = """
+        query Attestations {{
+            attestations(
+                orderBy: {{time: desc}},
+                where: {{
+                    time: {{
+                        lte: {end_timestamp},
+                        gte: {start_timestamp}
+                    }},
+                    schema: {{
+                        is: {{
+                            id: {{
+                                in: {schema_ids}
+                            }}
+                        }}
+                    }},
+                    attester: {{
+                        equals: "{attester}"
+                    }}
+                }},
+                take: {batch_size},
+                skip: {skip}
+            ) {{
+                id
+                data
+                decodedDataJson
+                revoked
+                ipfsHash
+                schema {{
+                    id
+                }}
+            }}
+        }}
+        """
+        
+        data_path = ['data', 'attestations']
+        return self.iter_all_records(
+            base_query, 
+            data_path, 
+            batch_size=batch_size,
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            schema_ids=json.dumps(sorted(schema_ids)),
+            attester=self.receiptsxyz_address,
+        )
     
     def query_user_workouts_with_inteval(
         self, 
@@ -234,6 +632,84 @@ class ReceiptsXYZV1GraphQLAPI:
         )
         return results
     
+    def query_users_workouts(
+        self,
+        addresses: List[str],
+        start_timestamp: Optional[int] = None,
+        end_timestamp: Optional[int] = None,
+        chunk_size: int = 100,
+        queries_per_request: int = 10,
+        batch_size: Optional[int] = None,
+    ) -> list:
+        """Fetches single workouts of many recipients, `chunk_size` addresses
+        per crawl, with the pages of up to `queries_per_request` crawls
+        fetched in one round trip.
+        
+        `batch_size` is the number of attestations per page. It defaults to
+        8000 records per round trip, split between its pages, so that a
+        batched response is no larger than a single unbatched page."""
+        if batch_size is None:
+            batch_size = max(8000 // queries_per_request, 1)
+        base_query = """
+        query Attestations {{
+            attestations(
+                orderBy: {{time: desc}},
+                where: {{
+                    recipient: {{
+                        in: {addresses}
+                    }},
+                    {condition}
+                    schema: {{
+                        is: {{
+                            id: {{
+                                equals: "{schema_id}"
+                            }}
+                        }}
+                    }},
+                    attester: {{
+                        equals: "{receiptsxyz_address}"
+                    }}
+                }},
+                take: {batch_size},
+                skip: {skip}
+            ) {{
+                id
+                txid
+                data
+                decodedDataJson
+                revoked
+                ipfsHash
+                schema {{
+                    id
+                }}
+            }}
+        }}
+        """
+        
+        condition = time_condition(start_timestamp, end_timestamp)
+        
+        data_path = ['data', 'attestations']
+        params = [
+            {
+                "addresses": json.dumps(addresses[i:i + chunk_size]),
+                "condition": condition,
+                "schema_id": self.schema_id["single_workout"],
+                "receiptsxyz_address": self.receiptsxyz_address,
+                "start_timestamp": start_timestamp,
+                "end_timestamp": end_timestamp,
+            }
+            for i in range(0, len(addresses), chunk_size)
+        ]
+        logging.info(f"Fetching workouts for {len(addresses)} addresses in {len(params)} crawls")
+        results = self.fetch_all_data_batched(
+            base_query,
+            data_path,
+            params,
+            batch_size=batch_size,
+            queries_per_request=queries_per_request,
+        )
+        return [_a for _r in results for _a in _r]
+    
     def query_receipts_users(self, from_timestamp: Optional[int] = None) -> List[str]:
         base_query = """
         query Users {{
@@ -276,11 +752,243 @@ class ReceiptsXYZV1GraphQLAPI:
         results = self.fetch_all_data(base_query, data_path, condition=condition)
         return results
     
+    def query_revoked(self, uids: List[str]) -> Dict[str, bool]:
+        """Fetches only the `revoked` flag of attestations, by UID."""
+        query = f"""
+        query Attestations {{
+            attestations(
+                where: {{
+                    id: {{
+                        in: {json.dumps(uids)}
+                    }}
+                }}
+            ) {{
+                id
+                revoked
+            }}
+        }}
+        """
+        
+        result = self.request_graphql(query, use_cache=False, priority=Priority.INTERACTIVE)
+        return {_a["id"]: _a["revoked"] for _a in result["data"]["attestations"]}
+    
+    def query_revocations(
+        self,
+        since: int,
+        attesters: Optional[List[str]] = None,
+        batch_size: int = 1000
+    ) -> list:
+        """Fetches attestations revoked at or after the `since` revocation time.
+        
+        Args:
+            since: Revocation time watermark, inclusive.
+            attesters: Attester addresses, defaults to `self.receiptsxyz_address`.
+            batch_size: Number of attestations per page.
+        """
+        base_query = """
+        query Revocations {{
+            attestations(
+                orderBy: {{revocationTime: asc}},
+                where: {{
+                    revoked: {{
+                        equals: true
+                    }},
+                    revocationTime: {{
+                        gte: {since}
+                    }},
+                    attester: {{
+                        in: {attesters}
+                    }}
+                }},
+                take: {batch_size},
+                skip: {skip}
+            ) {{
+                id
+                revocationTime
+                schema {{
+                    id
+                }}
+            }}
+        }}
+        """
+        
+        attesters = attesters or [self.receiptsxyz_address]
+        data_path = ['data', 'attestations']
+        results = self.fetch_all_data(
+            base_query,
+            data_path,
+            batch_size=batch_size,
+            use_cache=False,
+            since=since,
+            attesters=json.dumps(attesters),
+        )
+        return results
+    
+    def iter_schema_attestations(
+        self,
+        schema: str,
+        start_timestamp: Optional[int] = None,
+        end_timestamp: Optional[int] = None,
+        batch_size: int = 1000,
+        skip: int = 0,
+    ) -> Iterator[list]:
+        """Yields attestations of a schema page by page, newest first.
+        
+        Args:
+            schema: A key of `self.schema_id`, e.g. "single_workout".
+            start_timestamp: Only fetch attestations made at or after this time.
+            end_timestamp: Only fetch attestations made at or before this time.
+            batch_size: Number of attestations per page.
+            skip: Number of attestations to skip, to resume a crawl.
+        """
+        data_path = ['data', 'attestations']
+        return self.iter_all_data(
+            SCHEMA_ATTESTATIONS_QUERY,
+            data_path,
+            batch_size=batch_size,
+            skip=skip,
+            condition=time_condition(start_timestamp, end_timestamp),
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            schema_id=self.schema_id[schema],
+            receiptsxyz_address=self.receiptsxyz_address,
+        )
+    
+    def query_schema_windows(
+        self,
+        schema: str,
+        windows: List[Tuple[Optional[int], Optional[int]]],
+        batch_size: int = 1000,
+        queries_per_request: int = 10,
+    ) -> List[list]:
+        """Fetches the attestations of a schema in many time windows, with the
+        pages of up to `queries_per_request` windows fetched in one round trip.
+        
+        Args:
+            schema: A key of `self.schema_id`, e.g. "single_workout".
+            windows: (start, end) timestamps of every window, inclusive.
+            batch_size: Number of attestations per page.
+            queries_per_request: Maximum number of pages per request.
+        
+        Returns:
+            The attestations of every window, in the order of `windows`.
+        """
+        params = [
+            {
+                "condition": time_condition(_start, _end),
+                "start_timestamp": _start,
+                "end_timestamp": _end,
+                "schema_id": self.schema_id[schema],
+                "receiptsxyz_address": self.receiptsxyz_address,
+            }
+            for _start, _end in windows
+        ]
+        return self.fetch_all_data_batched(
+            SCHEMA_ATTESTATIONS_QUERY,
+            ['data', 'attestations'],
+            params,
+            batch_size=batch_size,
+            queries_per_request=queries_per_request,
+        )
+    
+    def watch(
+        self,
+        schema: str,
+        cursor: Optional["WatchCursor"] = None,
+        poll_interval: float = 60.0,
+        batch_size: int = 1000,
+        max_polls: Optional[int] = None,
+    ) -> Iterator[dict]:
+        """Polls for new attestations of a schema and yields each one once.
+        
+        Args:
+            schema: A key of `self.schema_id`, e.g. "single_workout".
+            cursor: Where to resume from. If None, only attestations made
+                from now on are yielded. The cursor is updated in place, so
+                it can be saved at any point and passed back later.
+            poll_interval: Seconds to wait between polls.
+            batch_size: Number of attestations per page.
+            max_polls: Stop after this many polls. Poll forever if None.
+            
+        Yields:
+            Raw attestation dictionaries, oldest first.
+        """
+        base_query = """
+        query Attestations {{
+            attestations(
+                orderBy: {{time: asc}},
+                where: {{
+                    time: {{
+                        gte: {from_timestamp}
+                    }},
+                    schema: {{
+                        is: {{
+                            id: {{
+                                equals: "{schema_id}"
+                            }}
+                        }}
+                    }},
+                    attester: {{
+                        equals: "{receiptsxyz_address}"
+                    }}
+                }},
+                take: {batch_size},
+                skip: {skip}
+            ) {{
+                id
+                time
+                txid
+                recipient
+                data
+                decodedDataJson
+                revoked
+                ipfsHash
+                schema {{
+                    id
+                }}
+            }}
+        }}
+        """
+        
+        if cursor is None:
+            from ..schema.base import WatchCursor
+            
+            cursor = WatchCursor(time=int(time.time()))
+        
+        data_path = ['data', 'attestations']
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            if polls > 0:
+                time.sleep(poll_interval)
+            polls += 1
+            
+            for page in self.iter_all_data(
+                base_query,
+                data_path,
+                batch_size=batch_size,
+                use_cache=False,
+                from_timestamp=cursor.time,
+                schema_id=self.schema_id[schema],
+                receiptsxyz_address=self.receiptsxyz_address,
+            ):
+                for attestation in page:
+                    # attestations at the cursor time may have been yielded already
+                    if attestation["time"] == cursor.time and attestation["id"] in cursor.uids:
+                        continue
+                    cursor.advance(attestation["time"], attestation["id"])
+                    yield attestation
+    
+    def watch_with_callback(self, schema: str, callback: Callable[[dict], None], **kwargs) -> None:
+        """Same as `watch`, but hands each new attestation to `callback`."""
+        for attestation in self.watch(schema, **kwargs):
+            callback(attestation)
+    
     
 class ReceiptsXYZLeaderboardAPI:
     
-    def __init__(self) -> None:
+    def __init__(self, priority: int = Priority.INTERACTIVE) -> None:
         self.endpoint = "https://leaderboard.receipts.xyz/api/receipts"
+        self.priority = priority
         
     def get_weekly_leaderboard(
         self, 
@@ -298,7 +1006,10 @@ class ReceiptsXYZLeaderboardAPI:
             "limit": "undefined" if limit is None else limit
         }
         
-        response = requests.get(self.endpoint, params=params)
+        import requests
+        
+        with get_scheduler().slot(self.priority):
+            response = requests.get(self.endpoint, params=params)
         
         if response.status_code != 200:
             logging.error(f"Leaderboard request failed with status code {response.status_code}")
@@ -1,10 +1,18 @@
-from .v1 import ReceiptsXYZV1GraphQLAPI
+from typing import Iterator, Optional
+
+from ..cache import ResponseCache
+from .scheduler import Priority
+from .v1 import ReceiptsXYZV1GraphQLAPI, time_condition
 
 
 class ReceiptsXYZV2GraphQLAPI(ReceiptsXYZV1GraphQLAPI):
     
-    def __init__(self) -> None:
-        super().__init__()
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        priority: int = Priority.DEFAULT
+    ) -> None:
+        super().__init__(cache=cache, priority=priority)
         self.receiptsxyz_address = "0x2261A703139c6230f2a9Fb173cc245B83348C6Ba"
         self.schema_id = {
             "workout": "0x306c3768de1da8b0d36386d395ccafd05526741a6d38a3cee1bbbb7765d461d2"
@@ -83,6 +91,8 @@ class ReceiptsXYZV2GraphQLAPI(ReceiptsXYZV1GraphQLAPI):
                 skip: {skip}
             ) {{
                 id
+                time
+                txid
                 data
                 decodedDataJson
                 revoked
@@ -104,4 +114,60 @@ class ReceiptsXYZV2GraphQLAPI(ReceiptsXYZV1GraphQLAPI):
             schema_id=self.schema_id['workout'],
         )
         return results
-    
\ No newline at end of file
+        
+    def iter_workouts(
+        self,
+        start_timestamp: Optional[int] = None,
+        end_timestamp: Optional[int] = None,
+        batch_size: int = 1000
+    ) -> Iterator[list]:
+        """Yields workout attestations page by page, newest first.
+        
+        The optional time window is pushed into the query. Stop iterating
+        to stop paging.
+        """
+        base_query = """
+        query Attestations {{
+            attestations(
+                orderBy: {{time: desc}},
+                where: {{
+                    {condition}
+                    schema: {{
+                        is: {{
+                            id: {{
+                                equals: "{schema_id}"
+                            }}
+                        }}
+                    }},
+                    attester: {{
+                        equals: "{receiptsxyz_address}"
+                    }}
+                }},
+                take: {batch_size},
+                skip: {skip}
+            ) {{
+                id
+                time
+                txid
+                data
+                decodedDataJson
+                revoked
+                ipfsHash
+                schema {{
+                    id
+                }}
+            }}
+        }}
+        """
+        
+        condition = time_condition(start_timestamp, end_timestamp)
+        
+        data_path = ['data', 'attestations']
+        return self.iter_all_data(
+            base_query,
+            data_path,
+            batch_size=batch_size,
+            condition=condition,
+            receiptsxyz_address=self.receiptsxyz_address,
+            schema_id=self.schema_id['workout'],
+        )
@@ -0,0 +1,359 @@
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from .api.scheduler import Priority
+from .export import EXPORT_FORMATS, EXPORT_SCHEMAS, _parse_page, _write_ndjson
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    id INTEGER PRIMARY KEY,
+    schema TEXT NOT NULL,
+    start_timestamp INTEGER NOT NULL,
+    end_timestamp INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    rows INTEGER,
+    error TEXT,
+    UNIQUE (schema, start_timestamp, end_timestamp)
+)
+"""
+
+UNIT_STATUSES = ["pending", "leased", "done", "failed"]
+
+
+def get_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class BackfillCoordinator:
+    """Job table of backfill work units in a SQLite file.
+
+    A unit is one schema over one time range. Workers claim a unit with a
+    lease, renew the lease while they fetch it and mark it done once its
+    output is written. A unit whose lease expired, because its worker
+    crashed or hung, is handed out again. Any number of processes can share
+    the file. Across hosts this relies on the file system honouring SQLite
+    locks, which some network file systems do not.
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = 5) -> None:
+        """
+        Args:
+            db_path: Path of the SQLite file, created if missing.
+            max_attempts: Number of claims of a unit before it is marked as
+                failed.
+        """
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        # autocommit, transactions are explicit
+        self._connection = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute(_SCHEMA)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def plan(
+        self,
+        schemas: List[str],
+        start_timestamp: int,
+        end_timestamp: Optional[int] = None,
+        unit_seconds: int = 7 * 86400,
+    ) -> int:
+        """Splits the time range of every schema into whole work units of
+        `unit_seconds`, aligned on `start_timestamp`. A remainder shorter
+        than a unit at the end of the range is left for a later plan, so
+        units never overlap and a unit's time range has ended before it is
+        processed. Units that already exist are kept as they are, so
+        planning again, e.g. with a later end, is safe.
+
+        Args:
+            schemas: Keys of `EXPORT_SCHEMAS`.
+            start_timestamp: Start of the range.
+            end_timestamp: End of the range, defaults to and is capped at
+                now.
+            unit_seconds: Length of the time range of a unit.
+
+        Returns:
+            The number of new units.
+        """
+        for schema in schemas:
+            if schema not in EXPORT_SCHEMAS:
+                raise ValueError(f"Unknown schema: {schema}, expected one of {list(EXPORT_SCHEMAS)}")
+        now = int(datetime.now(timezone.utc).timestamp())
+        end_timestamp = now if end_timestamp is None else min(end_timestamp, now)
+
+        # time conditions are inclusive, so units must not share a second
+        unit_count = max((end_timestamp - start_timestamp + 1) // unit_seconds, 0)
+        units = [
+            (_s, start_timestamp + _i * unit_seconds, start_timestamp + (_i + 1) * unit_seconds - 1)
+            for _s in schemas
+            for _i in range(unit_count)
+        ]
+        planned_until = start_timestamp + unit_count * unit_seconds
+        if planned_until <= end_timestamp:
+            logging.info(f"Left {planned_until}-{end_timestamp} for a later plan, it is shorter than a unit")
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            before = self._connection.total_changes
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO units (schema, start_timestamp, end_timestamp) VALUES (?, ?, ?)",
+                units
+            )
+            created = self._connection.total_changes - before
+        logging.info(f"Planned {created} new work units")
+        return created
+
+    def claim(self, worker: str, lease_seconds: float = 300) -> Optional[sqlite3.Row]:
+        """Leases the next pending or expired unit to `worker`, if any."""
+        now = time.time()
+        with self._connection:
+            # take the write lock up front, so two workers never claim the same unit
+            self._connection.execute("BEGIN IMMEDIATE")
+            while True:
+                unit = self._connection.execute(
+                    """
+                    SELECT * FROM units
+                    WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                    ORDER BY id
+                    LIMIT 1
+                    """,
+                    (now,)
+                ).fetchone()
+                if unit is None:
+                    return None
+                if unit["attempts"] < self.max_attempts:
+                    break
+                
+                self._connection.execute(
+                    "UPDATE units SET status = 'failed', worker = NULL WHERE id = ?",
+                    (unit["id"],)
+                )
+                logging.error(f"Gave up on work unit {unit['id']} after {unit['attempts']} attempts")
+
+            self._connection.execute(
+                """
+                UPDATE units
+                SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1
+                WHERE id = ?
+                """,
+                (worker, now + lease_seconds, unit["id"])
+            )
+        return unit
+
+    def renew(self, unit_id: int, worker: str, lease_seconds: float = 300) -> bool:
+        """Extends the lease of a unit. Returns False if `worker` lost it."""
+        with self._connection:
+            cursor = self._connection.execute(
+                """
+                UPDATE units SET lease_expires = ?
+                WHERE id = ? AND worker = ? AND status = 'leased'
+                """,
+                (time.time() + lease_seconds, unit_id, worker)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, unit_id: int, worker: str, rows: int) -> bool:
+        with self._connection:
+            cursor = self._connection.execute(
+                """
+                UPDATE units SET status = 'done', rows = ?, lease_expires = NULL, error = NULL
+                WHERE id = ? AND worker = ? AND status = 'leased'
+                """,
+                (rows, unit_id, worker)
+            )
+        return cursor.rowcount == 1
+
+    def release(self, unit_id: int, worker: str, error: str) -> None:
+        """Hands a unit that failed back to the queue."""
+        with self._connection:
+            self._connection.execute(
+                """
+                UPDATE units SET status = 'pending', worker = NULL, lease_expires = NULL, error = ?
+                WHERE id = ? AND worker = ? AND status = 'leased'
+                """,
+                (error, unit_id, worker)
+            )
+
+    def progress(self) -> dict:
+        """Number of units and rows per status."""
+        counts = {_s: {"units": 0, "rows": 0} for _s in UNIT_STATUSES}
+        for row in self._connection.execute(
+            "SELECT status, COUNT(*), COALESCE(SUM(rows), 0) FROM units GROUP BY status"
+        ):
+            counts[row[0]] = {"units": row[1], "rows": row[2]}
+        return counts
+
+
+def _unit_path(output_dir: str, unit: sqlite3.Row, output_format: str) -> str:
+    extension = "ndjson" if output_format == "ndjson" else "parquet"
+    return os.path.join(
+        output_dir, unit["schema"], f"{unit['start_timestamp']}-{unit['end_timestamp']}.{extension}"
+    )
+
+
+def _process_unit(
+    coordinator: BackfillCoordinator,
+    unit: sqlite3.Row,
+    worker: str,
+    output_dir: str,
+    output_format: str,
+    batch_size: int,
+    lease_seconds: float,
+) -> Optional[int]:
+    client_cls, parser = EXPORT_SCHEMAS[unit["schema"]]
+    path = _unit_path(output_dir, unit, output_format)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # per worker, a worker whose lease expired may still be writing
+    tmp_path = f"{path}.{worker}.tmp"
+
+    api = client_cls(priority=Priority.BULK)
+    offset = 0
+    rows = []
+    total = 0
+    for page in api.iter_schema_attestations(
+        unit["schema"],
+        start_timestamp=unit["start_timestamp"],
+        end_timestamp=unit["end_timestamp"],
+        batch_size=batch_size,
+    ):
+        page_rows = _parse_page(page, parser)
+        total += len(page_rows)
+        if output_format == "ndjson":
+            offset = _write_ndjson(tmp_path, page_rows, offset)
+        else:
+            rows.extend(page_rows)
+        if not coordinator.renew(unit["id"], worker, lease_seconds):
+            logging.warning(f"Lost the lease of work unit {unit['id']}, dropping it")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+    if output_format == "ndjson":
+        # an empty unit still gets its (empty) file
+        offset = _write_ndjson(tmp_path, [], offset)
+    else:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow, run `pip install pyarrow`")
+        pq.write_table(pa.Table.from_pylist(rows), tmp_path)
+
+    # the output is complete before the unit is marked as done, and the
+    # rename makes rewriting it by a later worker harmless
+    os.replace(tmp_path, path)
+    return total
+
+
+def run_worker(
+    db_path: str,
+    output_dir: str,
+    output_format: str = "ndjson",
+    batch_size: int = 1000,
+    lease_seconds: float = 300,
+    max_units: Optional[int] = None,
+) -> int:
+    """Claims and processes work units until none are left.
+
+    Every unit is written to `<output_dir>/<schema>/<start>-<end>.<format>`.
+
+    Args:
+        db_path: Path of the job table.
+        output_dir: Directory of the output files.
+        output_format: One of `EXPORT_FORMATS`.
+        batch_size: Number of attestations per page.
+        lease_seconds: Lease length, renewed after every page.
+        max_units: Stop after this many units.
+
+    Returns:
+        The number of completed units.
+    """
+    if output_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format: {output_format}, expected one of {EXPORT_FORMATS}")
+
+    coordinator = BackfillCoordinator(db_path)
+    worker = get_worker_id()
+    completed = 0
+    try:
+        while max_units is None or completed < max_units:
+            unit = coordinator.claim(worker, lease_seconds)
+            if unit is None:
+                break
+
+            logging.info(
+                f"Worker {worker} processing {unit['schema']} "
+                f"{unit['start_timestamp']}-{unit['end_timestamp']}"
+            )
+            try:
+                rows = _process_unit(
+                    coordinator, unit, worker, output_dir, output_format, batch_size, lease_seconds
+                )
+            except Exception as e:
+                logging.warning(f"Work unit {unit['id']} failed: {e}")
+                coordinator.release(unit["id"], worker, repr(e))
+                continue
+
+            if rows is not None and coordinator.complete(unit["id"], worker, rows):
+                completed += 1
+    finally:
+        coordinator.close()
+
+    logging.info(f"Worker {worker} completed {completed} work units")
+    return completed
+
+
+def _run_worker_process(kwargs: dict) -> None:
+    logging.basicConfig(level=logging.INFO)
+    run_worker(**kwargs)
+
+
+def run_backfill(
+    db_path: str,
+    output_dir: str,
+    workers: int = 4,
+    output_format: str = "ndjson",
+    batch_size: int = 1000,
+    lease_seconds: float = 300,
+) -> dict:
+    """Runs `workers` worker processes on this host until every unit is done.
+
+    Each process has its own request scheduler, so the request rate grows
+    with the number of workers.
+
+    Returns:
+        The progress of the job table.
+    """
+    kwargs = {
+        "db_path": db_path,
+        "output_dir": output_dir,
+        "output_format": output_format,
+        "batch_size": batch_size,
+        "lease_seconds": lease_seconds,
+    }
+    processes = [
+        multiprocessing.Process(target=_run_worker_process, args=(kwargs,))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    coordinator = BackfillCoordinator(db_path)
+    try:
+        progress = coordinator.progress()
+    finally:
+        coordinator.close()
+    logging.info(f"Backfill progress: {json.dumps(progress)}")
+    return progress
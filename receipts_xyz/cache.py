@@ -0,0 +1,336 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Set, Tuple
+
+
+# attestation UIDs, and other 32 byte hashes, in a cached response
+_UID = re.compile(r"0x[0-9a-fA-F]{64}")
+
+
+def get_default_cache_dir() -> str:
+    return os.path.join(os.path.expanduser("~"), ".cache", "receipts_xyz")
+
+
+class ResponseCache:
+    """Content-addressed on-disk cache of GraphQL responses.
+
+    Every entry is a JSON file named after the hash of its normalized query
+    and variables. Entries expire after their TTL, unless they are stored as
+    immutable, and the least recently used entries are evicted once the cache
+    grows past `max_size` bytes.
+
+    Note that immutable entries still hold the `revoked` flag as it was when
+    the response was fetched. The UIDs in every entry are listed in a small
+    `<key>.uids` file next to it, so `invalidate_uids` does not read the
+    entries themselves.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_size: int = 512 * 1024 * 1024,
+        ttl: Optional[float] = 300,
+    ) -> None:
+        """
+        Args:
+            cache_dir: Directory holding the entries.
+            max_size: Maximum total size of the entries in bytes.
+            ttl: Default time to live of mutable entries in seconds. If None,
+                mutable entries are not cached.
+        """
+        self.cache_dir = cache_dir or get_default_cache_dir()
+        self.max_size = max_size
+        self.ttl = ttl
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._size: Optional[int] = None
+
+    @staticmethod
+    def make_key(query: str, variables: Optional[dict] = None) -> str:
+        # whitespace in a GraphQL document is insignificant
+        normalized = re.sub(r"\s+", " ", query).strip()
+        payload = json.dumps([normalized, variables or {}], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    @staticmethod
+    def _uids_path(path: str) -> str:
+        return path[:-len(".json")] + ".uids"
+
+    def _write_atomic(self, path: str, content: str) -> None:
+        # concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if entry["expires_at"] is not None and entry["expires_at"] < time.time():
+            self._remove(path)
+            return None
+
+        # mark as recently used
+        os.utime(path)
+        return entry["value"]
+
+    def set(self, key: str, value: Any, immutable: bool = False, ttl: Optional[float] = None) -> None:
+        ttl = ttl if ttl is not None else self.ttl
+        if not immutable and ttl is None:
+            return
+
+        entry = {
+            "expires_at": None if immutable else time.time() + ttl,
+            "value": value,
+        }
+        content = json.dumps(entry)
+        path = self._path(key)
+        # the UID list is written first, so an entry never lacks one
+        self._write_atomic(self._uids_path(path), "\n".join(set(_UID.findall(content))))
+        size = self.size() - (os.path.getsize(path) if os.path.exists(path) else 0)
+        self._write_atomic(path, content)
+
+        self._size = size + os.path.getsize(path)
+        if self._size > self.max_size:
+            self.evict()
+
+    def _entries(self) -> list:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(self._uids_path(path))
+        except FileNotFoundError:
+            pass
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        if self._size is not None:
+            self._size -= size
+
+    def size(self) -> int:
+        if self._size is None:
+            self._size = sum(_size for _, _size, _ in self._entries())
+        return self._size
+
+    def evict(self) -> None:
+        """Removes least recently used entries until the cache fits `max_size`."""
+        entries = sorted(self._entries())
+        size = sum(_size for _, _size, _ in entries)
+        for _, entry_size, name in entries:
+            if size <= self.max_size:
+                break
+            self._remove(os.path.join(self.cache_dir, name))
+            size -= entry_size
+        self._size = size
+        logging.info(f"Evicted response cache down to {size} bytes")
+
+    def invalidate_uids(self, uids: Set[str]) -> int:
+        """Removes every entry mentioning one of `uids`, e.g. revoked attestations.
+
+        Returns:
+            The number of removed entries.
+        """
+        uids = {_uid.lower() for _uid in uids}
+        count = 0
+        for _, _, name in self._entries():
+            path = os.path.join(self.cache_dir, name)
+            try:
+                with open(self._uids_path(path), "r") as f:
+                    entry_uids = {_uid.lower() for _uid in f.read().split()}
+            except FileNotFoundError:
+                # written before UID lists, read the entry itself
+                try:
+                    with open(path, "r") as f:
+                        entry_uids = {_uid.lower() for _uid in _UID.findall(f.read())}
+                except FileNotFoundError:
+                    continue
+            if not uids.isdisjoint(entry_uids):
+                self._remove(path)
+                count += 1
+        logging.info(f"Invalidated {count} response cache entries")
+        return count
+
+    def clear(self) -> None:
+        for _, _, name in self._entries():
+            self._remove(os.path.join(self.cache_dir, name))
+        self._size = 0
+
+
+class UIDCache:
+    """In-process LRU cache of parsed attestations, e.g. `from_uid` results.
+
+    Attestations never change except for their `revoked` flag, so entries
+    never expire, but the flag is checked again with a light query once it
+    is older than `revocation_ttl`. If it changed, the entry is reloaded.
+
+    Cached objects are shared between callers and should not be modified.
+    """
+
+    def __init__(self, max_size: int = 1024, revocation_ttl: float = 60) -> None:
+        """
+        Args:
+            max_size: Maximum number of cached attestations.
+            revocation_ttl: Seconds after which the `revoked` flag of an
+                entry is checked again.
+        """
+        self.max_size = max_size
+        self.revocation_ttl = revocation_ttl
+
+        self._lock = threading.Lock()
+        # key -> (value, revoked, revocation checked at)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, bool, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.revocation_checks = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _query_revoked(uid: str) -> Optional[bool]:
+        from .api.v1 import ReceiptsXYZV1GraphQLAPI
+
+        return ReceiptsXYZV1GraphQLAPI().query_revoked([uid]).get(uid)
+
+    def get_or_load(self, uid: str, load: Callable[[], Tuple[Any, bool]], namespace: Hashable = None) -> Any:
+        """Returns the cached value of `uid`, loading it on a miss.
+
+        Args:
+            uid: The attestation UID.
+            load: Returns the parsed value and its `revoked` flag.
+            namespace: Separates values parsed differently from the same UID,
+                e.g. the receipt class.
+        """
+        key = (namespace, uid)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if time.monotonic() - entry[2] < self.revocation_ttl:
+                    self.hits += 1
+                    return entry[0]
+
+        if entry is not None:
+            value, revoked, _ = entry
+            # only the revoked flag can change
+            revoked_now = self._query_revoked(uid)
+            with self._lock:
+                self.revocation_checks += 1
+                if revoked_now == revoked:
+                    self.hits += 1
+                    if key in self._entries:
+                        self._entries[key] = (value, revoked, time.monotonic())
+                    return value
+
+        value, revoked = load()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (value, revoked, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate_uids(self, uids: Set[str]) -> int:
+        """Removes the entries of `uids`, e.g. revoked attestations.
+
+        Returns:
+            The number of removed entries.
+        """
+        with self._lock:
+            keys = [_k for _k in self._entries if _k[1] in uids]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "revocation_checks": self.revocation_checks,
+            "evictions": self.evictions,
+        }
+
+
+_response_cache: Optional[ResponseCache] = None
+_uid_cache: Optional[UIDCache] = None
+
+
+def enable_response_cache(
+    cache_dir: Optional[str] = None,
+    max_size: int = 512 * 1024 * 1024,
+    ttl: Optional[float] = 300,
+) -> ResponseCache:
+    """Enables the on-disk response cache for every GraphQL client in the process."""
+    global _response_cache
+    _response_cache = ResponseCache(cache_dir=cache_dir, max_size=max_size, ttl=ttl)
+    return _response_cache
+
+
+def disable_response_cache() -> None:
+    global _response_cache
+    _response_cache = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    return _response_cache
+
+
+def enable_uid_cache(max_size: int = 1024, revocation_ttl: float = 60) -> UIDCache:
+    """Enables the in-process cache of `from_uid` lookups."""
+    global _uid_cache
+    _uid_cache = UIDCache(max_size=max_size, revocation_ttl=revocation_ttl)
+    return _uid_cache
+
+
+def disable_uid_cache() -> None:
+    global _uid_cache
+    _uid_cache = None
+
+
+def get_uid_cache() -> Optional[UIDCache]:
+    return _uid_cache
+
+
+def cached_uid_lookup(uid: str, load: Callable[[], Tuple[Any, bool]], namespace: Hashable = None) -> Any:
+    """Looks `uid` up in the UID cache if it is enabled, otherwise loads it."""
+    uid_cache = _uid_cache
+    if uid_cache is None:
+        return load()[0]
+    return uid_cache.get_or_load(uid, load, namespace=namespace)
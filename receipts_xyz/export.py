@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from .api.scheduler import Priority
+from .api.v1 import ReceiptsXYZV1GraphQLAPI
+from .api.v2 import ReceiptsXYZV2GraphQLAPI
+from .exception import ParsingFailException
+from .schema.v1 import AttestationV1, SingleWorkoutReceipt, WeekToDateReceipt
+from .schema.v2 import AttestationV2, WorkoutReceipt
+
+
+def _parse_single_workout(attestation_data: dict) -> dict:
+    receipt = SingleWorkoutReceipt.from_attestation(AttestationV1.from_dict(attestation_data))
+    return {"uid": attestation_data["id"], **receipt.to_json()}
+
+
+def _parse_week_to_date(attestation_data: dict) -> dict:
+    receipt = WeekToDateReceipt.from_attestation(AttestationV1.from_dict(attestation_data))
+    return {"uid": attestation_data["id"], **receipt.to_json()}
+
+
+def _parse_user(attestation_data: dict) -> dict:
+    return {
+        "uid": attestation_data["id"],
+        "recipient": attestation_data["recipient"],
+        "time": attestation_data["time"],
+    }
+
+
+def _parse_workout(attestation_data: dict) -> dict:
+    return WorkoutReceipt.from_attestation(AttestationV2.from_dict(attestation_data)).to_json()
+
+
+# schema name -> (client, row parser)
+EXPORT_SCHEMAS: Dict[str, tuple] = {
+    "single_workout": (ReceiptsXYZV1GraphQLAPI, _parse_single_workout),
+    "week_to_date": (ReceiptsXYZV1GraphQLAPI, _parse_week_to_date),
+    "user": (ReceiptsXYZV1GraphQLAPI, _parse_user),
+    "workout": (ReceiptsXYZV2GraphQLAPI, _parse_workout),
+}
+
+EXPORT_FORMATS = ["ndjson", "parquet"]
+
+
+def _load_checkpoint(path: str) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _save_checkpoint(path: str, checkpoint: dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _parse_page(page: List[dict], parser: Callable[[dict], dict]) -> List[dict]:
+    rows = []
+    for _a in page:
+        try:
+            rows.append(parser(_a))
+        except ParsingFailException:
+            logging.warning(f"Failed to parse attestation: {_a['id']}")
+    return rows
+
+
+def _write_ndjson(path: str, rows: List[dict], offset: int) -> int:
+    mode = "r+b" if os.path.exists(path) else "wb"
+    with open(path, mode) as f:
+        # drop anything written after the last checkpoint
+        f.seek(offset)
+        f.truncate()
+        for row in rows:
+            f.write(json.dumps(row).encode("utf-8") + b"\n")
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+
+def _write_parquet(path: str, rows: List[dict], offset: int) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export requires pyarrow, run `pip install pyarrow`")
+
+    # one part file, and so one row group, per page
+    os.makedirs(path, exist_ok=True)
+    if rows:
+        part_path = os.path.join(path, f"part-{offset:05d}.parquet")
+        pq.write_table(pa.Table.from_pylist(rows), f"{part_path}.tmp")
+        os.replace(f"{part_path}.tmp", part_path)
+    return offset + 1
+
+
+def export_attestations(
+    schema: str,
+    output: str,
+    output_format: str = "ndjson",
+    start_timestamp: Optional[int] = None,
+    end_timestamp: Optional[int] = None,
+    batch_size: int = 1000,
+    checkpoint_path: Optional[str] = None,
+    max_retries: int = 5,
+) -> int:
+    """Streams all attestations of a schema in a time range to a file.
+
+    A checkpoint holding the paging cursor and the output offset is saved
+    after every page, so calling this again with the same arguments resumes
+    an interrupted export. Only one page is held in memory at a time.
+
+    Args:
+        schema: One of `EXPORT_SCHEMAS`.
+        output: Output NDJSON file, or output directory of Parquet parts.
+        output_format: One of `EXPORT_FORMATS`.
+        start_timestamp: Only export attestations made at or after this time.
+        end_timestamp: Only export attestations made at or before this time.
+            Defaults to the time the export started.
+        batch_size: Number of attestations per page.
+        checkpoint_path: Where to save the checkpoint. Defaults to
+            `<output>.checkpoint.json`.
+        max_retries: Number of retries of a failed page, with exponential
+            backoff, before giving up.
+
+    Returns:
+        The total number of exported rows.
+    """
+    if schema not in EXPORT_SCHEMAS:
+        raise ValueError(f"Unknown schema: {schema}, expected one of {list(EXPORT_SCHEMAS)}")
+    if output_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format: {output_format}, expected one of {EXPORT_FORMATS}")
+
+    client_cls, parser = EXPORT_SCHEMAS[schema]
+    write = _write_ndjson if output_format == "ndjson" else _write_parquet
+    checkpoint_path = checkpoint_path or f"{output.rstrip(os.sep)}.checkpoint.json"
+
+    checkpoint = _load_checkpoint(checkpoint_path)
+    params = {
+        "schema": schema,
+        "format": output_format,
+        "start_timestamp": start_timestamp,
+    }
+    if (
+        checkpoint is not None
+        and all(checkpoint[_k] == _v for _k, _v in params.items())
+        and end_timestamp in (None, checkpoint["end_timestamp"])
+    ):
+        logging.info(f"Resuming export from {checkpoint_path} at skip value: {checkpoint['skip']}")
+    else:
+        # fix the end of the range, so paging stays stable while resuming
+        if end_timestamp is None:
+            end_timestamp = int(datetime.now(timezone.utc).timestamp())
+        checkpoint = {
+            **params,
+            "end_timestamp": end_timestamp,
+            "skip": 0,
+            "offset": 0,
+            "rows": 0,
+        }
+
+    # backfill pages yield to interactive lookups in the same process
+    api = client_cls(priority=Priority.BULK)
+    retries = 0
+    while True:
+        try:
+            for page in api.iter_schema_attestations(
+                schema,
+                start_timestamp=checkpoint["start_timestamp"],
+                end_timestamp=checkpoint["end_timestamp"],
+                batch_size=batch_size,
+                skip=checkpoint["skip"],
+            ):
+                rows = _parse_page(page, parser)
+                checkpoint["offset"] = write(output, rows, checkpoint["offset"])
+                checkpoint["skip"] += len(page)
+                checkpoint["rows"] += len(rows)
+                _save_checkpoint(checkpoint_path, checkpoint)
+                logging.info(f"Exported {checkpoint['rows']} rows to {output}")
+                retries = 0
+            break
+        except Exception as e:
+            if retries >= max_retries:
+                raise
+            retries += 1
+            wait = 2 ** retries
+            logging.warning(f"Export page failed ({e}), retrying in {wait} seconds")
+            time.sleep(wait)
+
+    return checkpoint["rows"]
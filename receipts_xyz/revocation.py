@@ -0,0 +1,110 @@
+import json
+import logging
+import os
+from typing import Callable, Iterable, List, Optional, Set
+
+from .api.v1 import ReceiptsXYZV1GraphQLAPI
+from .api.v2 import ReceiptsXYZV2GraphQLAPI
+
+
+def get_receipts_attesters() -> List[str]:
+    """Attester addresses of both the v1 and v2 receipts schemas."""
+    return [
+        ReceiptsXYZV1GraphQLAPI().receiptsxyz_address,
+        ReceiptsXYZV2GraphQLAPI().receiptsxyz_address,
+    ]
+
+
+def apply_revocations(receipts: Iterable, uids: Set[str]) -> int:
+    """Marks v1 receipts (`SingleWorkoutReceipt`, `WeekToDateReceipt`, ...)
+    whose attestation was revoked, in place.
+
+    Returns:
+        The number of receipts marked as revoked.
+    """
+    count = 0
+    for receipt in receipts:
+        if receipt.metadata.uid in uids and not receipt.metadata.revoked:
+            receipt.metadata.revoked = True
+            count += 1
+    return count
+
+
+class RevocationSync:
+    """Incrementally finds attestations revoked since a saved watermark.
+
+    Every `sync` only asks for attestations whose `revocationTime` is past
+    the watermark, hands their UIDs to the registered handlers, and moves
+    the watermark forward. Handlers update whatever local state holds the
+    attestations, e.g. `ResponseCache.invalidate_uids` or
+    `WorkoutSeriesAggregator.remove`.
+    """
+
+    def __init__(
+        self,
+        watermark: int = 0,
+        attesters: Optional[List[str]] = None,
+        state_path: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            watermark: Revocation time up to which revocations are known.
+            attesters: Attester addresses, defaults to the receipts attesters.
+            state_path: If set, the watermark is loaded from and saved to
+                this JSON file.
+        """
+        self.attesters = attesters or get_receipts_attesters()
+        self.state_path = state_path
+        self.watermark = watermark
+        # UIDs already handled at the watermark time
+        self.uids: Set[str] = set()
+        self.handlers: List[Callable[[Set[str]], None]] = []
+
+        if state_path is not None and os.path.exists(state_path):
+            with open(state_path, "r") as f:
+                state = json.load(f)
+            self.watermark = state["watermark"]
+            self.uids = set(state["uids"])
+
+    def register(self, handler: Callable[[Set[str]], None]) -> None:
+        """Registers a handler called with the UIDs revoked in each sync."""
+        self.handlers.append(handler)
+
+    def save(self) -> None:
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"watermark": self.watermark, "uids": sorted(self.uids)}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def sync(self) -> Set[str]:
+        """Fetches new revocations and applies them.
+
+        Returns:
+            UIDs of the attestations revoked since the previous sync.
+        """
+        # revocations at the watermark time itself may land after a sync,
+        # so query them again and skip the ones already handled
+        revocations = [
+            _r for _r in ReceiptsXYZV1GraphQLAPI().query_revocations(
+                since=self.watermark,
+                attesters=self.attesters
+            )
+            if not (_r["revocationTime"] == self.watermark and _r["id"] in self.uids)
+        ]
+        uids = {_r["id"] for _r in revocations}
+        logging.info(f"Found {len(uids)} revocations since {self.watermark}")
+
+        if uids:
+            for handler in self.handlers:
+                handler(uids)
+
+        # only move the watermark once every handler has seen the revocations
+        for revocation in revocations:
+            if revocation["revocationTime"] > self.watermark:
+                self.watermark = revocation["revocationTime"]
+                self.uids = set()
+            if revocation["revocationTime"] == self.watermark:
+                self.uids.add(revocation["id"])
+        if self.state_path is not None:
+            self.save()
+        return uids
@@ -1,5 +1,9 @@
 from .base import (
     AttentationMetadata,
+    WatchCursor,
     WeekInterval,
-    parse_decoded_data_json
+    parse_decoded_data_json,
+    parse_local_time,
+    parse_speed,
+    parse_timezone
 )
\ No newline at end of file
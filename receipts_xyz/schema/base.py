@@ -1,7 +1,10 @@
 import json
 import logging
+import re
+import sys
 from datetime import datetime, timezone, timedelta
-from typing import Dict
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from pydantic import BaseModel
 
@@ -29,6 +32,46 @@ def parse_decoded_data_json(data: str) -> dict:
         
         parsed_dict[key] = value
     return parsed_dict
+
+
+
+_TIMEZONE_PATTERN = re.compile(r"\(GMT(?:([+-])(\d{2}):(\d{2}))?\)\s*(.*)")
+
+
+@lru_cache(maxsize=4096)
+def parse_timezone(value: str) -> Tuple[Optional[int], str]:
+    """Parses a receipt timezone such as "(GMT+07:00) Asia/Ho_Chi_Minh".
+
+    There are only a few hundred distinct timezones, so results are cached
+    and the region strings interned.
+
+    Returns:
+        A tuple of the UTC offset in seconds (None if it cannot be parsed)
+        and the region, e.g. "Asia".
+    """
+    match = _TIMEZONE_PATTERN.match(value)
+    if match is None:
+        return None, sys.intern(value.split("/")[0])
+    
+    sign, hours, minutes, name = match.groups()
+    offset = 0 if sign is None else int(hours) * 3600 + int(minutes) * 60
+    if sign == "-":
+        offset = -offset
+    return offset, sys.intern(name.split("/")[0])
+
+
+def parse_local_time(value: str) -> int:
+    """Parses a "%Y-%m-%dT%H:%M:%SZ" local time into the epoch seconds of
+    that wall clock time read as UTC."""
+    # `fromisoformat` is much faster than `strptime`, but only takes "Z" from 3.11
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+
+def parse_speed(value: str) -> Optional[float]:
+    """Parses an `average_speed` string (m/s), None for "null"."""
+    if value is None or value == "null":
+        return None
+    return float(value)
     
     
 class AttentationMetadata(BaseModel):
@@ -56,11 +99,20 @@ class WeekInterval(BaseModel):
         formatted_end = end_date.strftime("%-d %B %Y")
         return f"{formatted_start} - {formatted_end} (UTC)"
     
+    @property
+    def is_closed(self) -> bool:
+        """Whether the week has ended, so its attestations can no longer change."""
+        return self.end_timestamp < datetime.now(timezone.utc).timestamp()
+    
+    def contains(self, start_timestamp: int, end_timestamp: int) -> bool:
+        return self.start_timestamp <= start_timestamp and end_timestamp <= self.end_timestamp
+    
     @classmethod
-    def get_current_interval(cls) -> "WeekInterval":
-        now = datetime.now(timezone.utc)
+    def from_timestamp(cls, timestamp: int) -> "WeekInterval":
+        """Returns the week (Monday 00:00 - Sunday 23:59:59 UTC) containing `timestamp`."""
+        date = datetime.fromtimestamp(timestamp, timezone.utc)
         # Find the start of the week (Monday 00:00 UTC)
-        start_of_week = now - timedelta(days=now.weekday())
+        start_of_week = date - timedelta(days=date.weekday())
         start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
         
         # Find the end of the week (Sunday 23:59 UTC)
@@ -73,4 +125,34 @@ class WeekInterval(BaseModel):
             start_timestamp=start_timestamp,
             end_timestamp=end_timestamp
         )
-    
\ No newline at end of file
+    
+    @classmethod
+    def iter_range(cls, start_timestamp: int, end_timestamp: Optional[int] = None) -> Iterator["WeekInterval"]:
+        """Yields the weeks from the one containing `start_timestamp` to the
+        one containing `end_timestamp` (default now), oldest first."""
+        if end_timestamp is None:
+            end_timestamp = int(datetime.now(timezone.utc).timestamp())
+        
+        week = cls.from_timestamp(start_timestamp)
+        while week.start_timestamp <= end_timestamp:
+            yield week
+            week = cls.from_timestamp(week.end_timestamp + 1)
+    
+    @classmethod
+    def get_current_interval(cls) -> "WeekInterval":
+        return cls.from_timestamp(int(datetime.now(timezone.utc).timestamp()))
+
+
+class WatchCursor(BaseModel):
+    """Position of a `watch` poll: the latest attestation time seen and the
+    attestation ids already yielded at that time."""
+    
+    time: int
+    uids: List[str] = []
+    
+    def advance(self, time: int, uid: str) -> None:
+        if time > self.time:
+            self.time = time
+            self.uids = [uid]
+        elif time == self.time:
+            self.uids.append(uid)
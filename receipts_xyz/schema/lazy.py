@@ -0,0 +1,229 @@
+import json
+from datetime import datetime
+from functools import cached_property
+from typing import Any, Dict, Optional, Tuple, Union
+
+from ..exception import ParsingFailException
+from .base import AttentationMetadata, parse_local_time, parse_speed, parse_timezone
+from .v1 import (
+    AttestationV1,
+    SingleWorkoutReceipt,
+    SportType,
+    WeekToDateReceipt,
+    parse_sport_type,
+    parse_sport_types
+)
+from .v2 import AttestationV2, WorkoutReceipt
+
+
+class decoded_field:
+    """Descriptor reading one field of `decodedDataJson` on first access.
+
+    The decoded value is stored on the instance, so later reads are plain
+    attribute lookups.
+    """
+
+    def __init__(self, key: str = None) -> None:
+        self.key = key
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.name = name
+        self.key = self.key or name
+
+    def __get__(self, instance, owner=None) -> Any:
+        if instance is None:
+            return self
+        value = instance.decode_field(self.key)
+        instance.__dict__[self.name] = value
+        return value
+
+
+class LazyAttestation:
+    """Read-only view over a raw GraphQL attestation.
+
+    Nothing is parsed up front: `data` and `decodedDataJson` stay strings
+    until a field that needs them is accessed.
+    """
+
+    def __init__(self, attestation_data: dict) -> None:
+        self.raw = attestation_data
+
+    @property
+    def id(self) -> str:
+        return self.raw["id"]
+
+    @property
+    def revoked(self) -> bool:
+        return self.raw["revoked"]
+
+    @property
+    def ipfsHash(self) -> str:
+        return self.raw["ipfsHash"]
+
+    @cached_property
+    def data(self) -> dict:
+        data = self.raw["data"]
+        if isinstance(data, str):
+            if data.startswith("0x"):
+                raise ParsingFailException(f"Failed to parse attestation data: {data}")
+            data = json.loads(data)
+        return data
+
+    @cached_property
+    def schema_id(self) -> str:
+        # prefer the selected `schema { id }`, which needs no parsing
+        schema = self.raw.get("schema")
+        if schema is not None:
+            return schema["id"]
+        return self.data["sig"]["message"]["schema"]
+
+    @cached_property
+    def _decoded_items(self) -> Dict[str, Any]:
+        return {
+            _item["name"]: _item["value"]["value"]
+            for _item in json.loads(self.raw["decodedDataJson"])
+        }
+
+    def decode_field(self, key: str) -> Any:
+        value = self._decoded_items[key]
+        # handle case {'type': 'BigNumber', 'hex': '0x0114'}
+        if isinstance(value, dict) and value.get("type") == "BigNumber":
+            value = int(value["hex"], 16)
+        return value
+
+
+class LazyAttestationV1(LazyAttestation):
+
+    @cached_property
+    def metadata(self) -> AttentationMetadata:
+        return AttentationMetadata(
+            uid=self.id,
+            created_at=datetime.fromtimestamp(self.data["sig"]["message"]["time"]),
+            expiration=self.data["sig"]["message"]["expirationTime"],
+            revoked=self.revoked,
+            from_address=self.data["sig"]["message"]["recipient"],
+            to_address=self.data["signer"],
+            ipfs_hash=self.ipfsHash,
+        )
+
+    def to_attestation(self) -> AttestationV1:
+        return AttestationV1.from_dict(dict(self.raw))
+
+
+class LazySingleWorkoutReceipt(LazyAttestationV1):
+    """Lazy counterpart of `SingleWorkoutReceipt`."""
+
+    title = decoded_field()
+    receipt_type = decoded_field("type")
+    moving_time = decoded_field()
+    distance = decoded_field()
+    average_speed = decoded_field()
+    elevation_gain = decoded_field()
+    timezone = decoded_field()
+    local_time = decoded_field()
+    utc_time = decoded_field()
+    receipt_map = decoded_field("map")
+    strava_single_activity = decoded_field()
+    data_source = decoded_field()
+
+    to_json = SingleWorkoutReceipt.to_json
+    get_schema_id = staticmethod(SingleWorkoutReceipt.get_schema_id)
+
+    @cached_property
+    def sport_type(self) -> Union[SportType, str]:
+        return parse_sport_type(self.decode_field("sport_type"))
+
+    @cached_property
+    def speed(self) -> Optional[float]:
+        return parse_speed(self.average_speed)
+
+    @cached_property
+    def local_timestamp(self) -> int:
+        return parse_local_time(self.local_time)
+
+    @cached_property
+    def _parsed_timezone(self) -> Tuple[Optional[int], str]:
+        return parse_timezone(self.timezone)
+
+    @property
+    def utc_offset(self) -> Optional[int]:
+        return self._parsed_timezone[0]
+
+    @property
+    def region(self) -> str:
+        return self._parsed_timezone[1]
+
+    def is_single_workout(self) -> bool:
+        return self.schema_id == self.get_schema_id()
+
+    def to_receipt(self) -> SingleWorkoutReceipt:
+        return SingleWorkoutReceipt.from_attestation(self.to_attestation())
+
+    @classmethod
+    def from_uid(cls, uid: str) -> "LazySingleWorkoutReceipt":
+        return cls(AttestationV1.query_uid(uid))
+
+
+class LazyWeekToDateReceipt(LazyAttestationV1):
+    """Lazy counterpart of `WeekToDateReceipt`."""
+
+    activities = decoded_field()
+    running_distance = decoded_field()
+    cycling_distance = decoded_field()
+    moving_time = decoded_field()
+    range_start = decoded_field()
+    range_end = decoded_field()
+    strava_week_range = decoded_field()
+    data_source = decoded_field()
+
+    get_schema_id = staticmethod(WeekToDateReceipt.get_schema_id)
+
+    @cached_property
+    def sport_types(self) -> Dict[str, int]:
+        return parse_sport_types(self.decode_field("sport_types"))
+
+    def is_week_to_date(self) -> bool:
+        return self.schema_id == self.get_schema_id()
+
+    def to_receipt(self) -> WeekToDateReceipt:
+        return WeekToDateReceipt.from_attestation(self.to_attestation())
+
+    @classmethod
+    def from_uid(cls, uid: str) -> "LazyWeekToDateReceipt":
+        return cls(AttestationV1.query_uid(uid))
+
+
+class LazyWorkoutReceipt(LazyAttestation):
+    """Lazy counterpart of the v2 `WorkoutReceipt`."""
+
+    id = decoded_field()
+    name = decoded_field()
+    total_participants = decoded_field()
+    total_moving_time = decoded_field()
+    total_intensity_time = decoded_field()
+    total_run_distance = decoded_field()
+    total_bike_distance = decoded_field()
+    total_strength_time = decoded_field()
+    has_ended = decoded_field()
+
+    to_json = WorkoutReceipt.to_json
+    get_schema_id = staticmethod(WorkoutReceipt.get_schema_id)
+
+    @property
+    def aid(self) -> str:
+        return self.raw["id"]
+
+    @property
+    def txid(self) -> str:
+        return self.raw["txid"]
+
+    @property
+    def time(self) -> int:
+        return self.raw["time"]
+
+    def to_receipt(self) -> WorkoutReceipt:
+        return WorkoutReceipt.from_attestation(AttestationV2.from_dict(dict(self.raw)))
+
+    @classmethod
+    def from_uid(cls, uid: str) -> "LazyWorkoutReceipt":
+        return cls(AttestationV2.query_uid(uid))
@@ -1,14 +1,20 @@
 import json
+import sys
 from datetime import datetime
-from typing import Dict, Optional
+from enum import Enum
+from typing import Dict, Optional, Union
 
 from pydantic import BaseModel
 
 from ..api.v1 import ReceiptsXYZV1GraphQLAPI
+from ..cache import cached_uid_lookup
 from ..exception import ParsingFailException
 from .base import (
     AttentationMetadata,
-    parse_decoded_data_json
+    parse_decoded_data_json,
+    parse_local_time,
+    parse_speed,
+    parse_timezone
 )
 
 
@@ -50,8 +56,8 @@ class AttestationV1(BaseModel):
         
         return attestation
     
-    @classmethod
-    def from_uid(cls, uid: str) -> "AttestationV1":
+    @staticmethod
+    def query_uid(uid: str) -> dict:
         api = ReceiptsXYZV1GraphQLAPI()
         
         attestations = api.query_attestation(uid)["data"]["attestations"]
@@ -60,8 +66,15 @@ class AttestationV1(BaseModel):
         elif len(attestations) > 1:
             raise ValueError(f"UID {uid} found more than once in GraphQL API")
         
-        attestation = attestations[0]
-        return cls.from_dict(attestation)
+        return attestations[0]
+    
+    @classmethod
+    def from_uid(cls, uid: str) -> "AttestationV1":
+        def load():
+            attestation = cls.from_dict(cls.query_uid(uid))
+            return attestation, attestation.revoked
+        
+        return cached_uid_lookup(uid, load, namespace=cls)
     
     def to_metadata(self) -> "AttentationMetadata":
         return AttentationMetadata(
@@ -75,12 +88,50 @@ class AttestationV1(BaseModel):
         )
 
 
+class SportType(str, Enum):
+    """Strava sport type of a workout.
+
+    Compares equal to and formats as its string value. Sport types not
+    listed here are kept as plain, interned strings by `parse_sport_type`.
+    """
+    RUN = "Run"
+    TRAIL_RUN = "TrailRun"
+    VIRTUAL_RUN = "VirtualRun"
+    RIDE = "Ride"
+    GRAVEL_RIDE = "GravelRide"
+    MOUNTAIN_BIKE_RIDE = "MountainBikeRide"
+    VIRTUAL_RIDE = "VirtualRide"
+    WALK = "Walk"
+    HIKE = "Hike"
+    SWIM = "Swim"
+    ROWING = "Rowing"
+    ELLIPTICAL = "Elliptical"
+    WEIGHT_TRAINING = "WeightTraining"
+    WORKOUT = "Workout"
+    YOGA = "Yoga"
+    TENNIS = "Tennis"
+
+    def __str__(self) -> str:
+        return self.value
+
+    def __format__(self, format_spec: str) -> str:
+        return self.value.__format__(format_spec)
+
+
+def parse_sport_type(value: str) -> Union[SportType, str]:
+    """Parses a sport type, or interns it if it is not a `SportType`."""
+    try:
+        return SportType(value)
+    except ValueError:
+        return sys.intern(value)
+
+
 class SingleWorkoutReceipt(BaseModel):
     """Single Workout Receipt
     https://base.easscan.org/schema/view/0x48d9973eb6863978c104f85dc6864e827fc0f72c4083dd853171e0bf034f8774
     """
     title: str
-    sport_type: str # maybe enum?
+    sport_type: Union[SportType, str]
     receipt_type: str
     moving_time: int
     distance: int
@@ -93,12 +144,18 @@ class SingleWorkoutReceipt(BaseModel):
     strava_single_activity: bool
     data_source: str
     
+    # parsed from the string fields above by `from_attestation`
+    speed: Optional[float] = None # m/s, None if unknown
+    local_timestamp: Optional[int] = None # local wall clock time read as UTC
+    utc_offset: Optional[int] = None # in seconds
+    region: Optional[str] = None # e.g. "Asia"
+    
     metadata: AttentationMetadata
     
     def to_json(self) -> dict:
         return {
             "title": self.title,
-            "sport_type": self.sport_type,
+            "sport_type": str(self.sport_type),
             "receipt_type": self.receipt_type,
             "moving_time": self.moving_time,
             "distance": self.distance,
@@ -110,6 +167,10 @@ class SingleWorkoutReceipt(BaseModel):
             "receipt_map": self.receipt_map,
             "strava_single_activity": self.strava_single_activity,
             "data_source": self.data_source,
+            "speed": self.speed,
+            "local_timestamp": self.local_timestamp,
+            "utc_offset": self.utc_offset,
+            "region": self.region,
             "user_address": self.metadata.from_address
         }
         
@@ -122,16 +183,17 @@ class SingleWorkoutReceipt(BaseModel):
         return attestation.data["sig"]["message"]["schema"] == SingleWorkoutReceipt.get_schema_id()
     
     @classmethod
-    def from_attestation(cls, attestation: AttestationV1) -> "SingleWorkoutReceipt":
-        if not cls.is_single_workout(attestation):
+    def from_attestation(cls, attestation: AttestationV1, check_schema: bool = True) -> "SingleWorkoutReceipt":
+        if check_schema and not cls.is_single_workout(attestation):
             raise ValueError("Not a single workout attestation")
         
         decoded_str = attestation.decodedDataJson
         decoded_data = parse_decoded_data_json(decoded_str)
+        utc_offset, region = parse_timezone(decoded_data["timezone"])
         
         return cls(
             title=decoded_data["title"],
-            sport_type=decoded_data["sport_type"],
+            sport_type=parse_sport_type(decoded_data["sport_type"]),
             receipt_type=decoded_data["type"],
             moving_time=decoded_data["moving_time"],
             distance=decoded_data["distance"],
@@ -143,14 +205,27 @@ class SingleWorkoutReceipt(BaseModel):
             receipt_map=decoded_data["map"],
             strava_single_activity=decoded_data["strava_single_activity"],
             data_source=decoded_data["data_source"],
+            speed=parse_speed(decoded_data["average_speed"]),
+            local_timestamp=parse_local_time(decoded_data["local_time"]),
+            utc_offset=utc_offset,
+            region=region,
             metadata=attestation.to_metadata()
         )
         
     @classmethod
     def from_uid(cls, uid: str) -> "SingleWorkoutReceipt":
-        attestation = AttestationV1.from_uid(uid)
-        return cls.from_attestation(attestation)
+        def load():
+            attestation = AttestationV1.from_dict(AttestationV1.query_uid(uid))
+            return cls.from_attestation(attestation), attestation.revoked
         
+        return cached_uid_lookup(uid, load, namespace=cls)
+        
+
+def parse_sport_types(value: str) -> Dict[str, int]:
+    """Parses the `sport_types` JSON of a week to date receipt, with the
+    sport type names interned."""
+    return {str(parse_sport_type(_k)): _v for _k, _v in json.loads(value).items()}
+
 
 class WeekToDateReceipt(BaseModel):
     
@@ -166,6 +241,20 @@ class WeekToDateReceipt(BaseModel):
     
     metadata: AttentationMetadata
     
+    def to_json(self) -> dict:
+        return {
+            "activities": self.activities,
+            "sport_types": self.sport_types,
+            "running_distance": self.running_distance,
+            "cycling_distance": self.cycling_distance,
+            "moving_time": self.moving_time,
+            "range_start": self.range_start,
+            "range_end": self.range_end,
+            "strava_week_range": self.strava_week_range,
+            "data_source": self.data_source,
+            "user_address": self.metadata.from_address
+        }
+    
     @staticmethod
     def get_schema_id() -> str:
         return "0xcd6475d55ff914b51faf41f8f85a6bfe27875fc87eaa7d50762cf6c89050adac"
@@ -175,8 +264,8 @@ class WeekToDateReceipt(BaseModel):
         return attestation.data["sig"]["message"]["schema"] == WeekToDateReceipt.get_schema_id()
         
     @classmethod
-    def from_attestation(cls, attestation: AttestationV1) -> "WeekToDateReceipt":
-        if not cls.is_week_to_date(attestation):
+    def from_attestation(cls, attestation: AttestationV1, check_schema: bool = True) -> "WeekToDateReceipt":
+        if check_schema and not cls.is_week_to_date(attestation):
             raise ValueError("Not a single workout attestation")
         
         decoded_str = attestation.decodedDataJson
@@ -184,7 +273,7 @@ class WeekToDateReceipt(BaseModel):
         
         return cls(
             activities=decoded_data["activities"],
-            sport_types=json.loads(decoded_data["sport_types"]),
+            sport_types=parse_sport_types(decoded_data["sport_types"]),
             running_distance=decoded_data["running_distance"],
             cycling_distance=decoded_data["cycling_distance"],
             moving_time=decoded_data["moving_time"],
@@ -197,5 +286,8 @@ class WeekToDateReceipt(BaseModel):
         
     @classmethod
     def from_uid(cls, uid: str) -> "WeekToDateReceipt":
-        attestation = AttestationV1.from_uid(uid)
-        return cls.from_attestation(attestation)
+        def load():
+            attestation = AttestationV1.from_dict(AttestationV1.query_uid(uid))
+            return cls.from_attestation(attestation), attestation.revoked
+        
+        return cached_uid_lookup(uid, load, namespace=cls)
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 from .base import (
@@ -5,6 +7,7 @@ from .base import (
     parse_decoded_data_json
 )
 from ..api.v2 import ReceiptsXYZV2GraphQLAPI
+from ..cache import cached_uid_lookup
 from ..exception import ParsingFailException
 
 
@@ -18,8 +21,8 @@ class AttestationV2(BaseModel):
     revoked: bool
     ipfsHash: str
     
-    @classmethod
-    def from_uid(cls, uid: str) -> "AttestationV2":
+    @staticmethod
+    def query_uid(uid: str) -> dict:
         api = ReceiptsXYZV2GraphQLAPI()
         
         attestations = api.query_attestation(uid)["data"]["attestations"]
@@ -28,8 +31,15 @@ class AttestationV2(BaseModel):
         elif len(attestations) > 1:
             raise ValueError(f"UID {uid} found more than once in GraphQL API")
         
-        attestation = attestations[0]
-        return cls.from_dict(attestation)
+        return attestations[0]
+    
+    @classmethod
+    def from_uid(cls, uid: str) -> "AttestationV2":
+        def load():
+            attestation = cls.from_dict(cls.query_uid(uid))
+            return attestation, attestation.revoked
+        
+        return cached_uid_lookup(uid, load, namespace=cls)
     
     @classmethod
     def from_dict(cls, attestation_data: dict) -> "AttestationV2":
@@ -80,9 +90,14 @@ class WorkoutReceipt(BaseModel):
         return "0x306c3768de1da8b0d36386d395ccafd05526741a6d38a3cee1bbbb7765d461d2"
     
     @classmethod
-    def from_attestation(cls, attestation: AttestationV2) -> "WorkoutReceipt":
-        decoded_str = attestation.decodedDataJson
-        decoded_data = parse_decoded_data_json(decoded_str)
+    def from_attestation(
+        cls,
+        attestation: AttestationV2,
+        decoded_data: Optional[dict] = None
+    ) -> "WorkoutReceipt":
+        """`decoded_data` is the already parsed `decodedDataJson`, if any."""
+        if decoded_data is None:
+            decoded_data = parse_decoded_data_json(attestation.decodedDataJson)
         
         return cls(
             id=decoded_data["id"],
@@ -101,4 +116,8 @@ class WorkoutReceipt(BaseModel):
         
     @classmethod
     def from_uid(cls, uid: str) -> "WorkoutReceipt":
-        return cls.from_attestation(AttestationV2.from_uid(uid))
+        def load():
+            attestation = AttestationV2.from_dict(AttestationV2.query_uid(uid))
+            return cls.from_attestation(attestation), attestation.revoked
+        
+        return cached_uid_lookup(uid, load, namespace=cls)
@@ -0,0 +1,294 @@
+import atexit
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Set
+
+
+# path of the OTLP JSON lines file, or "otel" to use the OpenTelemetry API
+TRACE_ENV = "RECEIPTS_XYZ_TRACE"
+# directory of the per-stage cProfile reports
+PROFILE_DIR_ENV = "RECEIPTS_XYZ_PROFILE_DIR"
+# fraction of spans profiled
+PROFILE_SAMPLE_RATE_ENV = "RECEIPTS_XYZ_PROFILE_SAMPLE_RATE"
+
+_SPAN_KIND_INTERNAL = 1
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+_NULL_SPAN = nullcontext()
+
+# (trace id, span id) of the current span
+_current_span: contextvars.ContextVar = contextvars.ContextVar("receipts_xyz_span", default=None)
+
+# held while a span is profiled, cProfile allows one active profiler per
+# process from Python 3.12
+_profiling_lock = threading.Lock()
+
+
+def _attribute_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Tracer:
+    """Times pipeline stages as spans and optionally profiles a sample of them.
+
+    Spans are written as OTLP JSON lines, one `ExportTraceServiceRequest`
+    per line, which the OpenTelemetry collector reads with its
+    `otlpjsonfile` receiver. Alternatively, they are handed to the
+    OpenTelemetry API, if installed. Sampled spans are run under cProfile,
+    and the profiles are merged in memory into one report per stage, which
+    is written by `flush`.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        use_opentelemetry: bool = False,
+        profile_dir: Optional[str] = None,
+        profile_sample_rate: float = 0.01,
+        batch_size: int = 512,
+    ) -> None:
+        """
+        Args:
+            path: OTLP JSON lines file the spans are appended to.
+            use_opentelemetry: Report spans through the OpenTelemetry API
+                instead of a file.
+            profile_dir: If set, write per-stage cProfile reports
+                (`<stage>.prof` and `<stage>.txt`) to this directory.
+            profile_sample_rate: Fraction of the spans profiled.
+            batch_size: Number of spans written per line.
+        """
+        self.path = path
+        self.profile_dir = profile_dir
+        self.profile_sample_rate = profile_sample_rate
+        self.batch_size = batch_size
+
+        self._otel_tracer = None
+        if use_opentelemetry:
+            try:
+                from opentelemetry import trace
+            except ImportError:
+                raise ImportError("opentelemetry-api is required to report spans through OpenTelemetry")
+            self._otel_tracer = trace.get_tracer("receipts_xyz")
+
+        self._lock = threading.Lock()
+        self._buffer: List[dict] = []
+        self._profiles: Dict[str, pstats.Stats] = {}
+        # stages profiled since the reports were last written
+        self._updated_profiles: Set[str] = set()
+
+        if profile_dir is not None:
+            os.makedirs(profile_dir, exist_ok=True)
+        atexit.register(self.flush)
+
+    @classmethod
+    def from_env(cls) -> Optional["Tracer"]:
+        """Creates a tracer from the environment variables, or returns None
+        if neither tracing nor profiling is enabled."""
+        trace = os.environ.get(TRACE_ENV)
+        profile_dir = os.environ.get(PROFILE_DIR_ENV)
+        if not trace and not profile_dir:
+            return None
+        return cls(
+            path=trace if trace and trace != "otel" else None,
+            use_opentelemetry=trace == "otel",
+            profile_dir=profile_dir,
+            profile_sample_rate=float(os.environ.get(PROFILE_SAMPLE_RATE_ENV, 0.01)),
+        )
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[None]:
+        profile = None
+        if (
+            self.profile_dir is not None
+            and random.random() < self.profile_sample_rate
+            # one profile at a time, nested stages are included in it
+            and _profiling_lock.acquire(blocking=False)
+        ):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # another profiler, outside of this module, is active
+                profile = None
+                _profiling_lock.release()
+
+        try:
+            if self._otel_tracer is not None:
+                with self._otel_tracer.start_as_current_span(name, attributes=attributes):
+                    yield
+            elif self.path is not None:
+                with self._file_span(name, attributes):
+                    yield
+            else:
+                yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                _profiling_lock.release()
+                self._add_profile(name, profile)
+
+    @contextmanager
+    def _file_span(self, name: str, attributes: Dict[str, Any]) -> Iterator[None]:
+        parent = _current_span.get()
+        trace_id = parent[0] if parent is not None else os.urandom(16).hex()
+        span_id = os.urandom(8).hex()
+        token = _current_span.set((trace_id, span_id))
+
+        status = {"code": _STATUS_OK}
+        start = time.time_ns()
+        try:
+            yield
+        except BaseException as e:
+            status = {"code": _STATUS_ERROR, "message": repr(e)}
+            raise
+        finally:
+            end = time.time_ns()
+            _current_span.reset(token)
+            self._export({
+                "traceId": trace_id,
+                "spanId": span_id,
+                "parentSpanId": parent[1] if parent is not None else "",
+                "name": name,
+                "kind": _SPAN_KIND_INTERNAL,
+                "startTimeUnixNano": str(start),
+                "endTimeUnixNano": str(end),
+                "attributes": [
+                    {"key": _k, "value": _attribute_value(_v)} for _k, _v in attributes.items()
+                ],
+                "status": status,
+            })
+
+    def _export(self, span: dict) -> None:
+        with self._lock:
+            self._buffer.append(span)
+            if len(self._buffer) < self.batch_size:
+                return
+            spans, self._buffer = self._buffer, []
+        self._write(spans)
+
+    def _write(self, spans: List[dict]) -> None:
+        request = {
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": [{"key": "service.name", "value": {"stringValue": "receipts_xyz"}}]
+                },
+                "scopeSpans": [{
+                    "scope": {"name": "receipts_xyz"},
+                    "spans": spans,
+                }],
+            }]
+        }
+        line = json.dumps(request) + "\n"
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+
+    def _add_profile(self, name: str, profile: cProfile.Profile) -> None:
+        with self._lock:
+            if name in self._profiles:
+                self._profiles[name].add(profile)
+            else:
+                self._profiles[name] = pstats.Stats(profile)
+            self._updated_profiles.add(name)
+
+    def _write_profiles(self) -> None:
+        with self._lock:
+            names, self._updated_profiles = self._updated_profiles, set()
+            for name in names:
+                stats = self._profiles[name]
+                stats.dump_stats(os.path.join(self.profile_dir, f"{name}.prof"))
+                with open(os.path.join(self.profile_dir, f"{name}.txt"), "w") as f:
+                    stats.stream = f
+                    stats.sort_stats("cumulative").print_stats(30)
+        for name in names:
+            logging.info(f"Updated profile of stage {name}")
+
+    def add_span(self, name: str, start: int, end: int, **attributes: Any) -> None:
+        """Records a stage that has already run, from its start and end in
+        nanoseconds since the epoch."""
+        if self._otel_tracer is not None:
+            self._otel_tracer.start_span(name, attributes=attributes, start_time=start).end(end_time=end)
+            return
+        if self.path is None:
+            return
+        parent = _current_span.get()
+        self._export({
+            "traceId": parent[0] if parent is not None else os.urandom(16).hex(),
+            "spanId": os.urandom(8).hex(),
+            "parentSpanId": parent[1] if parent is not None else "",
+            "name": name,
+            "kind": _SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": str(start),
+            "endTimeUnixNano": str(end),
+            "attributes": [
+                {"key": _k, "value": _attribute_value(_v)} for _k, _v in attributes.items()
+            ],
+            "status": {"code": _STATUS_OK},
+        })
+
+    def flush(self) -> None:
+        """Writes the buffered spans and the updated profile reports."""
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+        if spans and self.path is not None:
+            self._write(spans)
+        if self.profile_dir is not None:
+            self._write_profiles()
+
+
+_tracer: Optional[Tracer] = Tracer.from_env()
+
+
+def enable_tracing(
+    path: Optional[str] = None,
+    use_opentelemetry: bool = False,
+    profile_dir: Optional[str] = None,
+    profile_sample_rate: float = 0.01,
+) -> Tracer:
+    """Enables stage spans and profiling for the process, in place of the
+    `RECEIPTS_XYZ_TRACE` / `RECEIPTS_XYZ_PROFILE_DIR` environment variables."""
+    global _tracer
+    if _tracer is not None:
+        _tracer.flush()
+    _tracer = Tracer(
+        path=path,
+        use_opentelemetry=use_opentelemetry,
+        profile_dir=profile_dir,
+        profile_sample_rate=profile_sample_rate,
+    )
+    return _tracer
+
+
+def disable_tracing() -> None:
+    global _tracer
+    if _tracer is not None:
+        _tracer.flush()
+    _tracer = None
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str, **attributes: Any) -> ContextManager[None]:
+    """Times a pipeline stage. Does nothing unless tracing or profiling is
+    enabled."""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, **attributes)
@@ -1,6 +1,6 @@
-from typing import Optional
+from typing import Dict, List, Optional
 
-from web3 import Web3
+# web3 is slow to import, so it is only imported by the functions needing it
 
 
 def get_default_mainnet_provider() -> str:
@@ -9,16 +9,22 @@ def get_default_mainnet_provider() -> str:
 
 
 def to_checksum_address(address: str) -> str:
+    # eth_utils ships with web3 and backs `Web3.to_checksum_address`,
+    # without the cost of importing the whole web3 package
+    from eth_utils import is_address, to_checksum_address as _to_checksum_address
+    
     # Validate if the address is a valid Ethereum address
-    if not Web3.is_address(address):
+    if not is_address(address):
         raise ValueError(f"Invalid Ethereum address: {address}")
     
     # Convert to checksum address
-    checksum_address = Web3.to_checksum_address(address)
+    checksum_address = _to_checksum_address(address)
     return checksum_address
         
 
 def resolve_ens_name(ens_name: str, rpc_url: Optional[str] = None) -> str:
+    from web3 import Web3
+    
     # Connect to an Ethereum node using Infura
     rpc_url = rpc_url or get_default_mainnet_provider()
     web3 = Web3(Web3.HTTPProvider(rpc_url))
@@ -36,3 +42,30 @@ def resolve_ens_name(ens_name: str, rpc_url: Optional[str] = None) -> str:
             raise Exception(f"ENS name '{ens_name}' not found")
     except Exception as e:
         raise Exception(f"Error resolving ENS name: {str(e)}")
+
+
+def resolve_ens_names(ens_names: List[str], rpc_url: Optional[str] = None) -> Dict[str, str]:
+    """Resolves several ENS names over a single connection.
+
+    Returns:
+        A dictionary mapping each ENS name to its address.
+    """
+    from web3 import Web3
+    
+    rpc_url = rpc_url or get_default_mainnet_provider()
+    web3 = Web3(Web3.HTTPProvider(rpc_url))
+    
+    if not web3.is_connected():
+        raise Exception("Unable to connect to the Ethereum network")
+    
+    addresses = {}
+    for ens_name in ens_names:
+        try:
+            address = web3.ens.address(ens_name)
+        except Exception as e:
+            raise Exception(f"Error resolving ENS name: {str(e)}")
+        if not address:
+            raise Exception(f"ENS name '{ens_name}' not found")
+        addresses[ens_name] = address
+    return addresses
+
@@ -1,2 +1,28 @@
-from .user import get_user_workouts
-from .weekly import get_weekly_attested_workouts
\ No newline at end of file
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .user import get_user_workouts, get_users_workouts
+    from .weekly import get_attested_workouts_for_weeks, get_weekly_attested_workouts
+
+
+_LAZY_ATTRIBUTES = {
+    "get_user_workouts": ".user",
+    "get_users_workouts": ".user",
+    "get_weekly_attested_workouts": ".weekly",
+    "get_attested_workouts_for_weeks": ".weekly",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,86 @@
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from ..api.v1 import ReceiptsXYZV1GraphQLAPI
+from ..exception import ParsingFailException
+from ..schema.v1 import AttestationV1, SingleWorkoutReceipt, WeekToDateReceipt
+from ..tracing import span
+
+
+# schema id -> parser of attestations of that schema
+_PARSERS: Dict[str, Callable[[AttestationV1], Any]] = {}
+
+
+def register_parser(schema_id: str, parser: Callable[[AttestationV1], Any]) -> None:
+    """Registers the parser of a schema, replacing any previous one.
+
+    The parser is only called with attestations of `schema_id`, so it does
+    not need to check the schema itself.
+    """
+    _PARSERS[schema_id] = parser
+
+
+def get_parsers() -> Dict[str, Callable[[AttestationV1], Any]]:
+    return dict(_PARSERS)
+
+
+register_parser(
+    SingleWorkoutReceipt.get_schema_id(),
+    lambda x: SingleWorkoutReceipt.from_attestation(x, check_schema=False)
+)
+register_parser(
+    WeekToDateReceipt.get_schema_id(),
+    lambda x: WeekToDateReceipt.from_attestation(x, check_schema=False)
+)
+
+
+def ingest_attestations(
+    start_timestamp: int,
+    end_timestamp: int,
+    schema_ids: Optional[List[str]] = None,
+    batch_size: int = 8000,
+) -> Dict[str, list]:
+    """Fetches the attestations of several schemas in a time window in one
+    crawl, and parses each with the parser registered for its schema.
+
+    Args:
+        start_timestamp: Only fetch attestations at or after this time.
+        end_timestamp: Only fetch attestations at or before this time.
+        schema_ids: Schemas to fetch, defaults to every registered schema.
+        batch_size: Number of attestations per page.
+
+    Returns:
+        A dictionary of schema id -> parsed attestations, e.g.
+        `SingleWorkoutReceipt`s and `WeekToDateReceipt`s.
+    """
+    parsers = get_parsers()
+    schema_ids = schema_ids or list(parsers)
+    missing = [_s for _s in schema_ids if _s not in parsers]
+    if missing:
+        raise ValueError(f"No parser registered for schemas: {missing}")
+
+    output = ReceiptsXYZV1GraphQLAPI().iter_schemas_with_interval(
+        schema_ids,
+        start_timestamp=start_timestamp,
+        end_timestamp=end_timestamp,
+        batch_size=batch_size,
+    )
+
+    results: Dict[str, list] = {_s: [] for _s in schema_ids}
+    for _a in output:
+        try:
+            with span("from_dict"):
+                attestation = AttestationV1.from_dict(_a)
+            schema_id = attestation.data["sig"]["message"]["schema"]
+            if schema_id not in results:
+                logging.warning(f"Skipping attestation {_a['id']} of unexpected schema {schema_id}")
+                continue
+            with span("from_attestation", schema_id=schema_id):
+                results[schema_id].append(parsers[schema_id](attestation))
+        except ParsingFailException:
+            logging.warning(f"Failed to parse attestation: {_a['id']}")
+
+    logging.info(
+        "Ingested " + ", ".join(f"{len(_r)} attestations of {_s}" for _s, _r in results.items())
+    )
+    return results
@@ -1,16 +1,44 @@
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 
+from ..api.scheduler import Priority
 from ..api.v1 import ReceiptsXYZV1GraphQLAPI
-from ..schema.base import AttestationV1
-from ..schema.v1 import SingleWorkoutReceipt
-from ..utils import resolve_ens_name, to_checksum_address
+from ..schema.lazy import LazySingleWorkoutReceipt
+from ..schema.v1 import AttestationV1, SingleWorkoutReceipt
+from ..utils import resolve_ens_name, resolve_ens_names, to_checksum_address
+
+
+def _parse_workouts(
+    output: List[dict],
+    sport_types: Optional[List[str]] = None,
+    start_utc_time: Optional[int] = None,
+    end_utc_time: Optional[int] = None,
+) -> List[SingleWorkoutReceipt]:
+    if sport_types is None and start_utc_time is None and end_utc_time is None:
+        return [SingleWorkoutReceipt.from_attestation(AttestationV1.from_dict(_a)) for _a in output]
+
+    # filter on lazy views, so only the matching workouts are fully parsed
+    workouts = []
+    for _a in output:
+        lazy = LazySingleWorkoutReceipt(_a)
+        if sport_types is not None and lazy.sport_type not in sport_types:
+            continue
+        if start_utc_time is not None and lazy.utc_time < start_utc_time:
+            continue
+        if end_utc_time is not None and lazy.utc_time > end_utc_time:
+            continue
+        workouts.append(lazy.to_receipt())
+    logging.info(f"Kept {len(workouts)} of {len(output)} workouts matching the filters")
+    return workouts
 
 
 def get_user_workouts(
     address: str, 
     start_timestamp: Optional[int] = None, 
     end_timestamp: Optional[int] = None,
+    sport_types: Optional[List[str]] = None,
+    start_utc_time: Optional[int] = None,
+    end_utc_time: Optional[int] = None,
 ) -> List[SingleWorkoutReceipt]:
     if not address.startswith("0x"):
         ens_name = address
@@ -20,10 +48,10 @@ def get_user_workouts(
     address = to_checksum_address(address)
     if start_timestamp is None and end_timestamp is None:
         logging.info("Fetching all attestations for address: {address}")
-        output = ReceiptsXYZV1GraphQLAPI().query_user_workouts(address=address)
+        output = ReceiptsXYZV1GraphQLAPI(priority=Priority.INTERACTIVE).query_user_workouts(address=address)
     else:
         logging.info(f"Fetching attestations for address: {address} between {start_timestamp} and {end_timestamp}")
-        output = ReceiptsXYZV1GraphQLAPI().query_user_workouts_with_inteval(
+        output = ReceiptsXYZV1GraphQLAPI(priority=Priority.INTERACTIVE).query_user_workouts_with_inteval(
             address=address, 
             start_timestamp=start_timestamp, 
             end_timestamp=end_timestamp
@@ -31,8 +59,65 @@ def get_user_workouts(
     
     logging.info(f"Found {len(output)} attestations for address: {address}")
     
-    return [
-        SingleWorkoutReceipt.from_attestation(
-            AttestationV1.from_dict(_a)
-        ) for _a in output]
-    
\ No newline at end of file
+    return _parse_workouts(output, sport_types, start_utc_time, end_utc_time)
+
+
+def get_users_workouts(
+    addresses: List[str],
+    start_timestamp: Optional[int] = None,
+    end_timestamp: Optional[int] = None,
+    as_table: bool = False,
+    chunk_size: int = 100,
+    sport_types: Optional[List[str]] = None,
+    start_utc_time: Optional[int] = None,
+    end_utc_time: Optional[int] = None,
+) -> Union[Dict[str, List[SingleWorkoutReceipt]], Dict[str, list]]:
+    """Fetches the workouts of many users in a few paged crawls.
+
+    Args:
+        addresses: Addresses or ENS names.
+        start_timestamp: Only fetch workouts attested at or after this time.
+        end_timestamp: Only fetch workouts attested at or before this time.
+        as_table: Return a single columnar table instead of per-user lists.
+        chunk_size: Number of addresses per query.
+        sport_types: Only keep workouts of these sport types, e.g. ["Run"].
+        start_utc_time: Only keep workouts done at or after this time.
+        end_utc_time: Only keep workouts done at or before this time.
+
+    Returns:
+        Either a dictionary mapping each input address to its workouts, or a
+        columnar table (column name -> values) of all workouts.
+    """
+    ens_names = [_a for _a in addresses if not _a.startswith("0x")]
+    resolved = resolve_ens_names(ens_names) if ens_names else {}
+    
+    # checksum address -> inputs resolving to it
+    inputs: Dict[str, List[str]] = {}
+    for address in addresses:
+        checksum_address = to_checksum_address(resolved.get(address, address))
+        inputs.setdefault(checksum_address, []).append(address)
+    
+    logging.info(f"Fetching attestations for {len(inputs)} addresses")
+    output = ReceiptsXYZV1GraphQLAPI(priority=Priority.INTERACTIVE).query_users_workouts(
+        list(inputs),
+        start_timestamp=start_timestamp,
+        end_timestamp=end_timestamp,
+        chunk_size=chunk_size,
+    )
+    logging.info(f"Found {len(output)} attestations for {len(inputs)} addresses")
+    
+    workouts = _parse_workouts(output, sport_types, start_utc_time, end_utc_time)
+    
+    if as_table:
+        rows = [_w.to_json() for _w in workouts]
+        columns = list(rows[0]) if rows else []
+        return {_c: [_r[_c] for _r in rows] for _c in columns}
+    
+    # recipients may come back in a different case than they were queried
+    lookup = {_a.lower(): _inputs for _a, _inputs in inputs.items()}
+    grouped: Dict[str, List[SingleWorkoutReceipt]] = {_a: [] for _a in addresses}
+    for workout in workouts:
+        for address in lookup.get(workout.metadata.from_address.lower(), []):
+            grouped[address].append(workout)
+    return grouped
+
@@ -1,32 +1,114 @@
 import logging
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 
+from ..api.scheduler import Priority
 from ..api.v1 import ReceiptsXYZV1GraphQLAPI
+from ..cache import ResponseCache, get_response_cache
 from ..exception import ParsingFailException
-from ..schema.base import AttestationV1, WeekInterval
-from ..schema.v1 import SingleWorkoutReceipt
+from ..schema.base import WeekInterval
+from ..schema.v1 import AttestationV1, SingleWorkoutReceipt, parse_sport_type
+from ..tracing import span
 from .utils import deduplicate_receipts
 
 
+def _fetch_week_workouts(
+    weekly_interval: WeekInterval,
+    deduplicate: bool = True,
+    priority: int = Priority.DEFAULT
+) -> List[SingleWorkoutReceipt]:
+    logging.info(f"Fetching attestations between {weekly_interval.formatted_interval}")
+    with span("weekly_attested_workouts", start_timestamp=weekly_interval.start_timestamp):
+        # records are parsed as they stream in, not after the whole page is read
+        output = ReceiptsXYZV1GraphQLAPI(priority=priority).iter_workouts_with_interval(
+            start_timestamp=weekly_interval.start_timestamp, 
+            end_timestamp=weekly_interval.end_timestamp
+        )
+        
+        workouts = list()
+        for _a in output:
+            try:
+                with span("from_dict"):
+                    attestation = AttestationV1.from_dict(_a)
+                if SingleWorkoutReceipt.is_single_workout(attestation):
+                    with span("from_attestation"):
+                        workouts.append(SingleWorkoutReceipt.from_attestation(attestation))
+            except ParsingFailException:
+                logging.warning(f"Failed to parse attestation: {_a['id']}")
+                
+        if deduplicate:
+            with span("deduplicate_receipts", receipts=len(workouts)):
+                workouts = deduplicate_receipts(workouts)
+    
+    return workouts
+
+
 def get_weekly_attested_workouts(deduplicate: bool = True) -> List[SingleWorkoutReceipt]:
-    weekly_interval = WeekInterval.get_current_interval()
+    return _fetch_week_workouts(WeekInterval.get_current_interval(), deduplicate=deduplicate)
 
-    logging.info(f"Fetching attestations between {weekly_interval.formatted_interval}")
-    output = ReceiptsXYZV1GraphQLAPI().query_workouts_with_interval(
-        start_timestamp=weekly_interval.start_timestamp, 
-        end_timestamp=weekly_interval.end_timestamp
+
+def _get_cached_week_workouts(
+    weekly_interval: WeekInterval,
+    cache: ResponseCache,
+    deduplicate: bool = True
+) -> List[SingleWorkoutReceipt]:
+    key = ResponseCache.make_key(
+        "weekly_attested_workouts",
+        {**weekly_interval.model_dump(), "deduplicate": deduplicate}
     )
+    cached = cache.get(key)
+    if cached is not None:
+        logging.info(f"Loaded cached workouts of {weekly_interval.formatted_interval}")
+        workouts = []
+        for _w in cached:
+            workout = SingleWorkoutReceipt.model_validate(_w)
+            # stored as its string value, which validates to a plain str
+            workout.sport_type = parse_sport_type(workout.sport_type)
+            workouts.append(workout)
+        return workouts
     
-    workouts = list()
-    for _a in output:
-        try:
-            attestation = AttestationV1.from_dict(_a)
-            if SingleWorkoutReceipt.is_single_workout(attestation):
-                workouts.append(SingleWorkoutReceipt.from_attestation(attestation))
-        except ParsingFailException:
-            logging.warning(f"Failed to parse attestation: {_a['id']}")
-            
-    if deduplicate:
-        workouts = deduplicate_receipts(workouts)
-    
+    # check before fetching, the week may close while it is being fetched
+    is_closed = weekly_interval.is_closed
+    # several weeks hold scheduler slots while their pages stream in, so
+    # they must not hold up interactive lookups
+    workouts = _fetch_week_workouts(weekly_interval, deduplicate=deduplicate, priority=Priority.BULK)
+    if is_closed:
+        # a week that has ended can no longer get new attestations
+        cache.set(key, [_w.model_dump(mode="json") for _w in workouts], immutable=True)
     return workouts
+
+
+def get_attested_workouts_for_weeks(
+    start_timestamp: int,
+    end_timestamp: Optional[int] = None,
+    deduplicate: bool = True,
+    max_workers: int = 4,
+    cache: Optional[ResponseCache] = None,
+) -> List[Tuple[WeekInterval, List[SingleWorkoutReceipt]]]:
+    """Fetches the attested workouts of every week in a range, several weeks
+    at a time.
+    
+    Weeks that have ended are cached with no expiry, so repeated reports only
+    fetch the weeks that are still open.
+    
+    Args:
+        start_timestamp: A time within the first week.
+        end_timestamp: A time within the last week, defaults to now.
+        deduplicate: Deduplicate the workouts within each week.
+        max_workers: Number of weeks fetched in parallel.
+        cache: Cache of closed weeks, defaults to the process-wide response
+            cache, or a `ResponseCache` in the default directory if it is
+            not enabled.
+    
+    Returns:
+        A list of (week, workouts) tuples, oldest week first.
+    """
+    cache = cache or get_response_cache() or ResponseCache()
+    weeks = list(WeekInterval.iter_range(start_timestamp, end_timestamp))
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            lambda x: _get_cached_week_workouts(x, cache, deduplicate=deduplicate),
+            weeks
+        )
+        return list(zip(weeks, results))
@@ -0,0 +1,195 @@
+from datetime import datetime, timezone, tzinfo
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..schema.v2 import WorkoutReceipt
+
+
+SERIES_FIELDS = [
+    "total_participants",
+    "total_moving_time",
+    "total_intensity_time",
+    "total_run_distance",
+    "total_bike_distance",
+    "total_strength_time",
+]
+
+DEFAULT_BUCKETS = {
+    "10min": 600,
+    "hour": 3600,
+    "day": 86400,
+}
+
+
+def lttb(xs: List[float], ys: List[float], threshold: int) -> Tuple[List[float], List[float]]:
+    """Downsamples a series with Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last points and, for every bucket in between, the
+    point forming the largest triangle with its neighbours, which preserves
+    the visual shape of the series.
+
+    Args:
+        xs: The x values, sorted in ascending order.
+        ys: The y values.
+        threshold: The maximum number of points to return.
+
+    Returns:
+        A tuple of downsampled x and y values.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(xs), list(ys)
+
+    sampled_x = [xs[0]]
+    sampled_y = [ys[0]]
+    bucket_size = (n - 2) / (threshold - 2)
+
+    a = 0
+    for i in range(threshold - 2):
+        # average point of the next bucket
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        next_len = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / next_len
+        avg_y = sum(ys[next_start:next_end]) / next_len
+
+        # pick the point in this bucket with the largest triangle area
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        max_area = -1.0
+        max_idx = start
+        for j in range(start, end):
+            area = abs(
+                (xs[a] - avg_x) * (ys[j] - ys[a])
+                - (xs[a] - xs[j]) * (avg_y - ys[a])
+            )
+            if area > max_area:
+                max_area = area
+                max_idx = j
+
+        sampled_x.append(xs[max_idx])
+        sampled_y.append(ys[max_idx])
+        a = max_idx
+
+    sampled_x.append(xs[-1])
+    sampled_y.append(ys[-1])
+    return sampled_x, sampled_y
+
+
+class WorkoutSeriesAggregator:
+    """Keeps bucketed snapshots of the cumulative `WorkoutReceipt` counters.
+
+    Every bucket holds the latest snapshot attested within it, which for
+    cumulative counters is the value at the end of the bucket. Snapshots are
+    updated as receipts are added, so reading a series does no aggregation.
+    """
+
+    def __init__(
+        self,
+        buckets: Optional[Dict[str, int]] = None,
+        tz: tzinfo = timezone.utc,
+    ) -> None:
+        self.buckets = buckets or DEFAULT_BUCKETS
+        self.tz = tz
+        self.latest: Optional[WorkoutReceipt] = None
+        # attestation id -> receipt, to rebuild buckets on revocation
+        self.receipts: Dict[str, WorkoutReceipt] = {}
+        # bucket name -> bucket start -> (time, values)
+        self._snapshots: Dict[str, Dict[int, Tuple[int, Tuple[int, ...]]]] = {
+            name: {} for name in self.buckets
+        }
+        self._series_cache: Dict[Tuple, Tuple[List[int], List[int]]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(_s) for _s in self._snapshots.values())
+
+    def _utcoffset(self, timestamp: int) -> int:
+        return int(datetime.fromtimestamp(timestamp, self.tz).utcoffset().total_seconds())
+
+    def _bucket_start(self, timestamp: int, seconds: int) -> int:
+        # align buckets on the local clock of `self.tz`: floor the local
+        # time, then map it back with the offset in effect at that local
+        # time, which differs from the one at `timestamp` if a DST
+        # transition falls inside the bucket
+        offset = self._utcoffset(timestamp)
+        local_start = (timestamp + offset) // seconds * seconds
+        starts = [
+            local_start - _o
+            for _o in {offset, self._utcoffset(local_start - offset)}
+            if self._utcoffset(local_start - _o) == _o and local_start - _o <= timestamp
+        ]
+        # a local time repeated when clocks go back maps to the latest start
+        return max(starts, default=local_start - offset)
+
+    def add(self, receipts: Iterable[WorkoutReceipt]) -> int:
+        """Adds receipts to the snapshots. Returns the number of updated buckets."""
+        updated = 0
+        for receipt in receipts:
+            self.receipts[receipt.aid] = receipt
+            values = tuple(getattr(receipt, _f) for _f in SERIES_FIELDS)
+            for name, seconds in self.buckets.items():
+                start = self._bucket_start(receipt.time, seconds)
+                snapshots = self._snapshots[name]
+                current = snapshots.get(start)
+                # re-adding the same snapshot, e.g. the last one of the
+                # previous fetch, is not an update
+                if current is None or (receipt.time >= current[0] and current != (receipt.time, values)):
+                    snapshots[start] = (receipt.time, values)
+                    updated += 1
+            if self.latest is None or receipt.time >= self.latest.time:
+                self.latest = receipt
+
+        if updated > 0:
+            self._series_cache.clear()
+        return updated
+
+    def remove(self, aids: Iterable[str]) -> int:
+        """Removes receipts, e.g. revoked attestations, and rebuilds the
+        buckets they were in. Returns the number of removed receipts."""
+        removed = [self.receipts.pop(_aid) for _aid in aids if _aid in self.receipts]
+        if not removed:
+            return 0
+
+        for name, seconds in self.buckets.items():
+            snapshots = self._snapshots[name]
+            starts = {self._bucket_start(_r.time, seconds) for _r in removed}
+            for start in starts:
+                snapshots.pop(start, None)
+            for receipt in self.receipts.values():
+                start = self._bucket_start(receipt.time, seconds)
+                if start in starts and (start not in snapshots or receipt.time >= snapshots[start][0]):
+                    snapshots[start] = (receipt.time, tuple(getattr(receipt, _f) for _f in SERIES_FIELDS))
+
+        self.latest = max(self.receipts.values(), key=lambda x: x.time, default=None)
+        self._series_cache.clear()
+        return len(removed)
+
+    def series(
+        self,
+        field: str,
+        bucket: str = "hour",
+        max_points: Optional[int] = None
+    ) -> Tuple[List[int], List[int]]:
+        """Returns the bucket start timestamps and values of `field`.
+
+        Args:
+            field: One of `SERIES_FIELDS`.
+            bucket: One of the configured bucket names.
+            max_points: If set, downsample the series with LTTB to at most
+                this many points.
+
+        Returns:
+            A tuple of timestamps and values, sorted by time.
+        """
+        key = (field, bucket, max_points)
+        if key in self._series_cache:
+            return self._series_cache[key]
+
+        idx = SERIES_FIELDS.index(field)
+        snapshots = self._snapshots[bucket]
+        xs = sorted(snapshots)
+        ys = [snapshots[_x][1][idx] for _x in xs]
+        if max_points is not None:
+            xs, ys = lttb(xs, ys, max_points)
+
+        self._series_cache[key] = (xs, ys)
+        return xs, ys
@@ -1,18 +1,82 @@
-from typing import List
+import json
+import logging
+from typing import List, Optional
 
 from ..api.v2 import ReceiptsXYZV2GraphQLAPI
+from ..schema.base import parse_decoded_data_json
 from ..schema.v2 import WorkoutReceipt, AttestationV2
 
 
-def get_onchainsummer_workouts() -> List[WorkoutReceipt]:
+ONCHAIN_SUMMER_CAMPAIGN = "Onchain Summer Olympics"
+
+
+def get_campaign_workouts(
+    name: str,
+    start_timestamp: Optional[int] = None,
+    end_timestamp: Optional[int] = None,
+    batch_size: int = 1000,
+    stop_after_empty_pages: Optional[int] = None,
+) -> List[WorkoutReceipt]:
+    """Fetches the workout receipts of a single campaign, newest first.
+
+    Paging runs to `start_timestamp`, or to the oldest attestation if it is
+    not set.
+
+    Args:
+        name: The campaign name, e.g. "Onchain Summer Olympics".
+        start_timestamp: Only fetch attestations made at or after this time.
+        end_timestamp: Only fetch attestations made at or before this time.
+        batch_size: Number of attestations per page.
+        stop_after_empty_pages: If set, stop paging once the campaign has
+            been seen and this many pages in a row have none of its
+            receipts. This guesses where the campaign started, and drops
+            its older receipts if other campaigns fill that many pages in
+            between.
+
+    Returns:
+        A list of the receipts that are not revoked, sorted by time in
+        descending order.
+    """
     api = ReceiptsXYZV2GraphQLAPI()
-    workouts = [
-        WorkoutReceipt.from_attestation(
-            AttestationV2.from_dict(_w)
-        )
-        for _w in api.query_workouts()
-    ]
-    return sorted([
-        _w for _w in workouts
-        if _w.name == "Onchain Summer Olympics"
-    ], key=lambda x: x.time, reverse=True)
+    # cheap pre-filter on the raw decoded string before parsing it, which
+    # holds non-ASCII characters as they are
+    encoded_name = json.dumps(name, ensure_ascii=False)
+
+    workouts = list()
+    seen = False
+    empty_pages = 0
+    for page in api.iter_workouts(
+        start_timestamp=start_timestamp,
+        end_timestamp=end_timestamp,
+        batch_size=batch_size
+    ):
+        matched = 0
+        for _w in page:
+            if encoded_name not in _w["decodedDataJson"]:
+                continue
+            decoded_data = parse_decoded_data_json(_w["decodedDataJson"])
+            if decoded_data.get("name") != name:
+                continue
+            matched += 1
+            if _w["revoked"]:
+                # revoked before it was fetched, so a revocation sync that
+                # already ran will not report it
+                continue
+            workouts.append(
+                WorkoutReceipt.from_attestation(AttestationV2.from_dict(_w), decoded_data=decoded_data)
+            )
+
+        seen = seen or matched > 0
+        empty_pages = 0 if matched > 0 else empty_pages + 1
+        if stop_after_empty_pages is not None and seen and empty_pages >= stop_after_empty_pages:
+            logging.info(f"No receipts of campaign {name} in {empty_pages} pages, stop paging")
+            break
+
+    return sorted(workouts, key=lambda x: x.time, reverse=True)
+
+
+def get_onchainsummer_workouts(start_timestamp: Optional[int] = None) -> List[WorkoutReceipt]:
+    return get_campaign_workouts(
+        ONCHAIN_SUMMER_CAMPAIGN,
+        start_timestamp=start_timestamp
+    )
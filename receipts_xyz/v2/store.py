@@ -0,0 +1,207 @@
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..schema.v2 import WorkoutReceipt
+from .aggregate import SERIES_FIELDS
+
+
+STORE_COLUMNS = ["time"] + SERIES_FIELDS
+
+_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def _smallest_dtype(deltas: np.ndarray) -> np.dtype:
+    if len(deltas) == 0:
+        return np.dtype(np.int8)
+    low, high = int(deltas.min()), int(deltas.max())
+    for dtype in _DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    raise OverflowError(f"Deltas out of int64 range: [{low}, {high}]")
+
+
+class CampaignSeries:
+    """Read view over the stored snapshots of one campaign.
+
+    Columns are memory-mapped and only decoded (cumulative sum of the deltas)
+    on first access.
+    """
+
+    def __init__(self, path: str, meta: dict) -> None:
+        self.path = path
+        self.meta = meta
+        self._decoded: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.meta["length"]
+
+    def _deltas(self, column: str) -> np.ndarray:
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.int64)
+        dtype = np.dtype(self.meta["columns"][column]["dtype"])
+        return np.memmap(
+            os.path.join(self.path, f"{column}.{dtype.name}.bin"), dtype=dtype, mode="r", shape=(len(self),)
+        )
+
+    def column(self, column: str) -> np.ndarray:
+        if column not in self._decoded:
+            base = self.meta["columns"][column]["base"]
+            self._decoded[column] = base + np.cumsum(self._deltas(column), dtype=np.int64)
+        return self._decoded[column]
+
+    @property
+    def time(self) -> np.ndarray:
+        return self.column("time")
+
+    def _index_range(self, start: Optional[int], end: Optional[int]) -> Tuple[int, int]:
+        time = self.time
+        lo = 0 if start is None else int(np.searchsorted(time, start, side="left"))
+        hi = len(time) if end is None else int(np.searchsorted(time, end, side="right"))
+        return lo, hi
+
+    def slice(
+        self,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        columns: Optional[List[str]] = None
+    ) -> Dict[str, np.ndarray]:
+        """Returns the snapshots with `start <= time <= end`, as column arrays."""
+        lo, hi = self._index_range(start, end)
+        return {_c: self.column(_c)[lo:hi] for _c in (columns or STORE_COLUMNS)}
+
+    def rate(
+        self,
+        column: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        per: int = 3600
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Rate of change of a counter between consecutive snapshots.
+
+        Args:
+            column: One of `SERIES_FIELDS`.
+            start: Only use snapshots at or after this time.
+            end: Only use snapshots at or before this time.
+            per: Time unit of the rate in seconds, hourly by default.
+
+        Returns:
+            A tuple of the end time of each interval and the rate over it.
+        """
+        lo, hi = self._index_range(start, end)
+        time = self.time[lo:hi]
+        values = self.column(column)[lo:hi]
+        return time[1:], np.diff(values) * per / np.diff(time)
+
+
+class WorkoutSeriesStore:
+    """Append-only store of `WorkoutReceipt` snapshots, one directory per
+    campaign `id`.
+
+    Each column is a flat binary file (`<column>.<dtype>.bin`) of deltas
+    between consecutive snapshots, in the smallest integer type that fits
+    them, next to a `meta.json` holding the length, dtype, first and last
+    value of every column. Loading memory-maps the files, so nothing is parsed.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _campaign_path(self, campaign_id: str) -> str:
+        return os.path.join(self.path, str(campaign_id))
+
+    def _load_meta(self, campaign_id: str) -> dict:
+        meta_path = os.path.join(self._campaign_path(campaign_id), "meta.json")
+        if not os.path.exists(meta_path):
+            return {"length": 0, "columns": {}}
+        with open(meta_path, "r") as f:
+            return json.load(f)
+
+    def _save_meta(self, campaign_id: str, meta: dict) -> None:
+        meta_path = os.path.join(self._campaign_path(campaign_id), "meta.json")
+        with open(f"{meta_path}.tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    def campaigns(self) -> List[str]:
+        return sorted(
+            _name for _name in os.listdir(self.path)
+            if os.path.exists(os.path.join(self.path, _name, "meta.json"))
+        )
+
+    def load(self, campaign_id: str) -> CampaignSeries:
+        return CampaignSeries(self._campaign_path(campaign_id), self._load_meta(campaign_id))
+
+    def append(self, receipts: Iterable[WorkoutReceipt]) -> int:
+        """Appends snapshots newer than the latest stored one of their campaign.
+
+        Returns:
+            The number of appended snapshots.
+        """
+        by_campaign: Dict[str, List[WorkoutReceipt]] = {}
+        for receipt in receipts:
+            by_campaign.setdefault(receipt.id, []).append(receipt)
+
+        appended = 0
+        for campaign_id, campaign_receipts in by_campaign.items():
+            appended += self._append_campaign(campaign_id, campaign_receipts)
+        return appended
+
+    def _append_campaign(self, campaign_id: str, receipts: List[WorkoutReceipt]) -> int:
+        path = self._campaign_path(campaign_id)
+        os.makedirs(path, exist_ok=True)
+        meta = self._load_meta(campaign_id)
+
+        last_time = meta["columns"]["time"]["last"] if meta["length"] else None
+        receipts = sorted(
+            (_r for _r in receipts if last_time is None or _r.time > last_time),
+            key=lambda x: x.time
+        )
+        # keep one snapshot per second
+        receipts = [
+            _r for i, _r in enumerate(receipts)
+            if i + 1 == len(receipts) or receipts[i + 1].time != _r.time
+        ]
+        if not receipts:
+            return 0
+
+        length = meta["length"]
+        stale_files = []
+        for column in STORE_COLUMNS:
+            values = np.array([getattr(_r, column) for _r in receipts], dtype=np.int64)
+            info = meta["columns"].get(column)
+            if info is None:
+                info = {"base": int(values[0]), "last": int(values[0]), "dtype": "int8"}
+            deltas = np.diff(values, prepend=np.int64(info["last"] if length else info["base"]))
+
+            dtype = np.dtype(info["dtype"])
+            new_dtype = max(dtype, _smallest_dtype(deltas), key=lambda x: x.itemsize)
+            file_path = os.path.join(path, f"{column}.{new_dtype.name}.bin")
+            if new_dtype != dtype and length:
+                # widen the stored deltas into a new file, the old one stays
+                # valid until the meta pointing at the new one is saved
+                old_path = os.path.join(path, f"{column}.{dtype.name}.bin")
+                stored = np.fromfile(old_path, dtype=dtype, count=length)
+                stored.astype(new_dtype).tofile(file_path)
+                stale_files.append(old_path)
+
+            mode = "r+b" if os.path.exists(file_path) else "wb"
+            with open(file_path, mode) as f:
+                # drop bytes of an append interrupted before its meta was saved
+                f.truncate(length * new_dtype.itemsize)
+                f.seek(0, os.SEEK_END)
+                deltas.astype(new_dtype).tofile(f)
+
+            info["dtype"] = new_dtype.name
+            info["last"] = int(values[-1])
+            meta["columns"][column] = info
+
+        meta["length"] = length + len(receipts)
+        self._save_meta(campaign_id, meta)
+        for stale_file in stale_files:
+            os.remove(stale_file)
+        return len(receipts)